@@ -0,0 +1,36 @@
+"""
+Scaling of the recorder's frame conversion stage (BGRA -> RGB + downscale).
+
+    python -m benchmarks.bench_convert [frames] [max_workers]
+"""
+import os
+import sys
+import time
+from core.recorder import convert_frames
+
+RESOLUTIONS = {"1080p": (1920, 1080), "4K": (3840, 2160)}
+
+def synthetic_frames(size, count, distinct=4):
+    w, h = size
+    buffers = [os.urandom(w * h * 4) for _ in range(distinct)]
+    return [(buffers[i % distinct], size) for i in range(count)]
+
+def run(count=24, max_workers=None):
+    max_workers = max_workers or os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, 8, max_workers} & set(range(1, max_workers + 1)))
+    results = {}
+    for name, size in RESOLUTIONS.items():
+        frames = synthetic_frames(size, count)
+        base = None
+        for workers in worker_counts:
+            start = time.perf_counter()
+            list(convert_frames(frames, workers=workers))
+            elapsed = time.perf_counter() - start
+            base = base or elapsed
+            results[(name, workers)] = elapsed
+            print(f"{name:>6} x{count}  workers={workers:<3} {elapsed:7.3f}s  {count / elapsed:7.1f} fps  speedup {base / elapsed:4.2f}x")
+    return results
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    run(*args)
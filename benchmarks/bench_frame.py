@@ -0,0 +1,59 @@
+"""
+Full-image copies and time for one region screenshot (save as PNG, show
+the preview, copy to the clipboard): the previous eager PIL pipeline vs.
+core.frame.Frame.
+
+    python -m benchmarks.bench_frame [repeat]
+
+Frame copies come from core.frame.COPIES. The old pipeline's copies are
+counted by hand at each step that materialised a whole image.
+"""
+import io
+import sys
+import time
+import tempfile
+from PIL import Image
+from core import frame
+from core.backends import SyntheticBackend
+from core.capture import CaptureManager
+from core.manager import FileManager
+
+CROP = (200, 100, 2120, 1180) # 1920x1080 out of a 4K screen
+PREVIEW = (1200, 800)
+
+def old_pipeline(shot, file_manager):
+    copies = 0
+    img = Image.frombytes("RGB", shot.size, shot.bgra, "raw", "BGRX").crop(CROP); copies += 3 # bgra, decode, crop
+    file_manager.save_screenshot(img); copies += 1
+    disp = img.copy(); copies += 1
+    disp = disp.resize((1200, 675), Image.Resampling.LANCZOS); copies += 1
+    out = io.BytesIO()
+    img.convert("RGB").save(out, "BMP"); copies += 2
+    out.getvalue()[14:]; copies += 2
+    return copies
+
+def new_pipeline(shot, file_manager):
+    frame.COPIES.clear()
+    f = CaptureManager.crop_shot(shot, CROP[0], CROP[1], CROP[2] - CROP[0], CROP[3] - CROP[1])
+    file_manager.save_screenshot(f)
+    f.fit(*PREVIEW)
+    f.dib()
+    return sum(frame.COPIES.values())
+
+def run(repeat=5):
+    capture = CaptureManager(lambda: SyntheticBackend(3840, 2160))
+    shot = capture.grab_raw(0)
+    file_manager = FileManager(tempfile.mkdtemp())
+    results = {}
+    for name, fn in (("eager PIL", old_pipeline), ("Frame", new_pipeline)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            copies = fn(shot, file_manager)
+        ms = (time.perf_counter() - start) / repeat * 1000
+        results[name] = (ms, copies)
+        print(f"{name:>10}: {ms:8.1f} ms  {copies} full-image copies")
+    capture.close()
+    return results
+
+if __name__ == "__main__":
+    run(*[int(a) for a in sys.argv[1:]])
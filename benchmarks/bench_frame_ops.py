@@ -0,0 +1,70 @@
+"""
+Per-frame cost of BGRA conversion on a 4K grab: the previous PIL round
+trips vs. utils.frame_ops.
+
+    python -m benchmarks.bench_frame_ops [repeat]
+
+Allocations are reported two ways. "py_peak_mb" is the tracemalloc peak,
+which covers bytes copies and NumPy buffers. "pil_blocks" is the number
+of new image blocks Pillow allocated (Image.core.get_stats). The banded
+2x path allocates many small strip blocks instead of one 4K block.
+"""
+import os
+import sys
+import time
+import tracemalloc
+from PIL import Image
+from utils import frame_ops
+
+SIZE = (3840, 2160)
+CROP = (1000, 600, 2920, 1680) # 1920x1080 region
+
+def pil_blocks():
+    stats = getattr(Image.core, "get_stats", None)
+    return stats()["new_count"] if stats else 0
+
+def old_full(raw):
+    return Image.frombytes("RGB", SIZE, bytes(raw), "raw", "BGRX")
+
+def old_recorder(raw):
+    img = Image.frombytes("RGB", SIZE, bytes(raw), "raw", "BGRX")
+    img.thumbnail((1920, 1080), Image.Resampling.LANCZOS)
+    return img
+
+def old_crop(raw):
+    return Image.frombytes("RGB", SIZE, bytes(raw), "raw", "BGRX").crop(CROP)
+
+def measure(fn, raw, repeat):
+    fn(raw) # Warm up
+    blocks = pil_blocks()
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(raw)
+    elapsed = (time.perf_counter() - start) / repeat
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 2 ** 20, (pil_blocks() - blocks) / repeat
+
+def run(repeat=10):
+    raw = bytearray(os.urandom(SIZE[0] * SIZE[1] * 4))
+    cases = [
+        ("full: frombytes(bgra)", old_full),
+        ("full: frame_ops.to_pil", lambda r: frame_ops.to_pil(r, SIZE)),
+        ("recorder: frombytes + LANCZOS", old_recorder),
+        ("recorder: to_pil 2x box", lambda r: frame_ops.to_pil(r, SIZE, factor=2)),
+        ("crop: frombytes + crop", old_crop),
+        ("crop: to_pil strided", lambda r: frame_ops.to_pil(r, SIZE, crop=CROP)),
+    ]
+    if frame_ops.HAS_NUMPY:
+        cases.append(("array: to_rgb_array 2x box", lambda r: frame_ops.to_rgb_array(r, SIZE, factor=2)))
+    print(f"4K frame, NumPy {'on' if frame_ops.HAS_NUMPY else 'off'}, {repeat} runs each")
+    results = {}
+    for name, fn in cases:
+        ms, peak, blocks = measure(fn, raw, repeat)
+        results[name] = (ms, peak, blocks)
+        print(f"{name:<32} {ms:8.2f} ms  py_peak_mb {peak:7.1f}  pil_blocks {blocks:5.1f}")
+    return results
+
+if __name__ == "__main__":
+    run(*[int(a) for a in sys.argv[1:]])
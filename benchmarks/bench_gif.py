@@ -0,0 +1,52 @@
+"""
+GIF export: Pillow save_all (the previous path) vs. the delta-frame GifWriter.
+
+    python -m benchmarks.bench_gif [frames] [width] [height]
+
+Frames imitate a mostly static UI: a fixed window layout with a text
+caret and a small progress bar changing between frames.
+"""
+import os
+import sys
+import time
+import tempfile
+from PIL import Image, ImageDraw
+from core.recorder import write_gif
+
+def synthetic_ui_frames(count, size):
+    base = Image.new("RGB", size, (30, 30, 30))
+    draw = ImageDraw.Draw(base)
+    w, h = size
+    draw.rectangle([0, 0, w, 40], fill=(0, 120, 215))
+    for i in range(12):
+        draw.rectangle([20, 60 + i * 50, w // 3, 90 + i * 50], fill=(60 + i * 10, 60, 60))
+        draw.text((w // 3 + 30, 65 + i * 50), f"Line {i}: lorem ipsum dolor sit amet", fill=(220, 220, 220))
+    frames = []
+    for i in range(count):
+        frame = base.copy()
+        d = ImageDraw.Draw(frame)
+        d.text((w // 3 + 30, h - 80), "typing" + "." * (i % 20), fill=(255, 255, 255))
+        d.rectangle([20, h - 30, 20 + (i * 7) % (w - 40), h - 20], fill=(76, 175, 80))
+        frames.append(frame)
+    return frames
+
+def run(count=60, width=1280, height=720):
+    frames = synthetic_ui_frames(count, (width, height))
+    durations = [100] * count
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        start = time.perf_counter()
+        path = os.path.join(tmpdir, "pillow.gif")
+        frames[0].save(path, save_all=True, append_images=frames[1:], optimize=True, duration=durations, loop=0)
+        results["pillow"] = (time.perf_counter() - start, os.path.getsize(path))
+
+        start = time.perf_counter()
+        path = write_gif(os.path.join(tmpdir, "delta.gif"), frames, durations)
+        results["delta"] = (time.perf_counter() - start, os.path.getsize(path))
+
+    for name, (elapsed, size) in results.items():
+        print(f"{name:>7}: {elapsed:7.3f}s  {size / 1024:9.1f} KB  ({count} frames {width}x{height})")
+    return results
+
+if __name__ == "__main__":
+    run(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,45 @@
+"""
+Whole-desktop capture: one grab of the virtual screen vs. parallel
+per-monitor grabs stitched into a canvas (CaptureManager.capture_all_monitors).
+
+    python -m benchmarks.bench_multimonitor [repeat] [--mss]
+
+The synthetic layout is three 4K monitors of different heights, so the
+single-rectangle grab also reads dead space. With --mss the real monitors
+are used.
+"""
+import sys
+import time
+from core.backends import MssBackend, SyntheticBackend
+from core.capture import CaptureManager
+
+LAYOUT = [(3840, 2160), (3840, 1600), (2160, 1440)]
+
+def timed(fn, repeat):
+    fn() # Warm up handles and the thread pool
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+def run(repeat=5, use_mss=False):
+    factory = MssBackend if use_mss else (lambda: SyntheticBackend(sizes=LAYOUT, change_rate=0))
+    capture = CaptureManager(factory)
+    monitors = capture.get_monitors()
+    vscr = monitors[0]
+    used = sum(m["width"] * m["height"] for m in monitors[1:])
+    print(f"{len(monitors) - 1} monitors, virtual screen {vscr['width']}x{vscr['height']}, "
+          f"{100 - 100 * used / (vscr['width'] * vscr['height']):.0f}% dead space")
+
+    results = {}
+    results["single_rect"], _ = timed(lambda: capture.capture_full_screen(0), repeat)
+    results["parallel_stitched"], _ = timed(lambda: capture.capture_all_monitors(), repeat)
+    results["parallel_separate"], _ = timed(lambda: capture.capture_all_monitors(separate=True), repeat)
+    capture.close()
+    for name, ms in results.items():
+        print(f"{name:>18}: {ms:8.1f} ms")
+    return results
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if a != "--mss"]
+    run(*[int(a) for a in args], use_mss="--mss" in sys.argv)
@@ -0,0 +1,60 @@
+"""
+Parallel PNG writer (utils.png_writer) vs. Pillow's single-threaded
+encoder on a stitched multi-monitor capture, across worker counts.
+Every output is decoded and compared with the source pixels.
+
+    python -m benchmarks.bench_png [repeat] [level]
+
+The layout is three 4K monitors plus a 1440p one (about 30 megapixels).
+Speed-up is relative to one worker; it can only go past 1x on a machine
+with more than one core.
+"""
+import io
+import os
+import sys
+import time
+from PIL import Image
+from core.backends import SyntheticBackend
+from core.capture import CaptureManager
+from utils.png_writer import encode_png
+
+LAYOUT = [(3840, 2160), (3840, 2160), (3840, 2160), (2560, 1440)]
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+def pillow_png(img, level):
+    out = io.BytesIO()
+    img.save(out, "PNG", compress_level=level)
+    return out.getvalue()
+
+def identical(data, img):
+    decoded = Image.open(io.BytesIO(data))
+    return decoded.mode == img.mode and decoded.tobytes() == img.tobytes()
+
+def run(repeat=3, level=6):
+    capture = CaptureManager(lambda: SyntheticBackend(sizes=LAYOUT))
+    img = capture.capture_all_monitors()
+    capture.close()
+    cpus = os.cpu_count() or 1
+    print(f"{img.width}x{img.height} ({img.width * img.height / 1e6:.1f} MP), level {level}, {cpus} CPUs")
+
+    results = {}
+    ms, data = timed(lambda: pillow_png(img, level), repeat)
+    results["pillow"] = (ms, len(data), identical(data, img))
+    workers = 1
+    while workers <= max(cpus, 1):
+        ms, data = timed(lambda: encode_png(img, level, workers=workers), repeat)
+        results[f"parallel x{workers}"] = (ms, len(data), identical(data, img))
+        workers *= 2
+
+    base = results["parallel x1"][0]
+    for name, (ms, size, same) in results.items():
+        print(f"{name:>12}: {ms:8.1f} ms  {size / 2 ** 20:7.2f} MB  {base / ms:4.1f}x  decode {'identical' if same else 'MISMATCH'}")
+    return results
+
+if __name__ == "__main__":
+    run(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,54 @@
+"""
+Batch redaction (utils.redaction) vs. the old one-box-at-a-time
+apply_blur, on a still and on a recording's BGRA grab buffers.
+
+    python -m benchmarks.bench_redact [boxes] [repeat]
+
+Boxes are random text-line-sized rectangles on a 1080p frame, so some
+overlap and get merged.
+"""
+import sys
+import time
+import random
+from PIL import Image, ImageFilter
+from core.backends import SyntheticBackend
+from utils.redaction import MODES, Redactor, redact
+
+SIZE = (1920, 1080)
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def blur_each(img, boxes):
+    for box in boxes:
+        box = (box[0], box[1], min(box[2], img.width), min(box[3], img.height))
+        img.paste(img.crop(box).filter(ImageFilter.GaussianBlur(radius=10)), box)
+
+def run(count=40, repeat=10):
+    rnd = random.Random(0)
+    boxes = []
+    for _ in range(count):
+        x, y = rnd.randrange(SIZE[0] - 20), rnd.randrange(SIZE[1] - 10)
+        boxes.append((x, y, x + rnd.randrange(20, 200), y + rnd.randrange(10, 60)))
+    with SyntheticBackend(*SIZE) as backend:
+        shot = backend.grab(backend.monitors[1])
+    img = Image.frombytes("RGB", shot.size, shot.bgra, "raw", "BGRX")
+    print(f"{count} boxes on {SIZE[0]}x{SIZE[1]}, {len(Redactor(boxes, SIZE).groups)} groups after merging")
+
+    results = {"apply_blur per box": timed(lambda: blur_each(img.copy(), boxes), repeat)}
+    for mode in MODES:
+        results[f"still {mode}"] = timed(lambda: redact(img.copy(), boxes, mode), repeat)
+    for mode in MODES:
+        redactor, raw = Redactor(boxes, SIZE, mode), bytearray(shot.raw)
+        results[f"frame {mode}"] = timed(lambda: redactor.apply_buffer(raw), repeat)
+    copy = timed(lambda: img.copy(), repeat)
+    for name, ms in results.items():
+        print(f"{name:>20}: {ms:7.2f} ms")
+    print(f"(stills include a {copy:.2f} ms image copy per run)")
+    return results
+
+if __name__ == "__main__":
+    run(*[int(a) for a in sys.argv[1:]])
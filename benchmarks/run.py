@@ -0,0 +1,151 @@
+"""
+End-to-end benchmark of the screenshot and recording pipelines.
+Prints JSON so results can be diffed between releases.
+
+    python -m benchmarks.run [--backend synthetic|mss] [--resolution 1920x1080]
+                             [--frames 30] [--repeat 5] [--change-rate 0.3]
+                             [--record-seconds 2] [--output results.json]
+
+The synthetic backend needs no display, so this runs on headless CI.
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import contextlib
+import platform
+import tempfile
+from datetime import datetime
+import PIL
+from PIL import Image
+from core.backends import MssBackend, SyntheticBackend
+from core.capture import CaptureManager
+from core.manager import FileManager
+from core.recorder import ScreenRecorder, ChangeDetector, convert_frames, write_gif, make_mp4_encoder
+
+def timed(fn, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return {"mean_ms": round(sum(times) / len(times), 3), "min_ms": round(times[0], 3),
+            "max_ms": round(times[-1], 3), "runs": repeat}, result
+
+def bench_screenshot(backend_factory, file_manager, repeat):
+    results = {}
+    capture = CaptureManager(backend_factory)
+    monitor = capture.get_monitors()[1]
+    results["grab"], shot = timed(lambda: capture.sct.grab(monitor), repeat)
+    results["convert"], img = timed(lambda: Image.frombytes("RGB", shot.size, shot.bgra, "raw", "BGRX"), repeat)
+
+    def encode():
+        buf = io.BytesIO()
+        img.save(buf, format=file_manager.config["format"].upper(), quality=file_manager.config["quality"])
+        return buf
+    results["encode"], _ = timed(encode, repeat)
+    results["save"], _ = timed(lambda: file_manager.save_screenshot(img), repeat)
+    results["capture_full_screen"], _ = timed(lambda: capture.capture_full_screen(1), repeat)
+    capture.close()
+    return results
+
+def bench_recording(backend_factory, file_manager, frames, repeat, record_seconds):
+    results = {}
+    with backend_factory() as sct:
+        monitor = sct.monitors[1]
+
+        def grab_all():
+            detector = ChangeDetector()
+            kept = []
+            for _ in range(frames):
+                shot = sct.grab(monitor)
+                bgra = shot.bgra
+                if not detector.is_duplicate(bgra):
+                    kept.append((bgra, shot.size))
+            return kept, detector.skipped
+        results["capture"], (raw, skipped) = timed(grab_all, 1)
+    results["capture"]["frames_skipped"] = skipped
+
+    results["convert"], images = timed(lambda: list(convert_frames(raw)), repeat)
+    out_dir = tempfile.mkdtemp()
+    try:
+        results["encode_gif"], _ = timed(lambda: write_gif(os.path.join(out_dir, "b.gif"), images, [100] * len(images)), repeat)
+
+        def encode_mp4():
+            encoder = make_mp4_encoder(os.path.join(out_dir, "b.mp4"), raw[0][1], 10)
+            encoder.start()
+            for i, (bgra, size) in enumerate(raw):
+                encoder.write_until(bgra, (i + 1) / 10.0)
+            return encoder.close()
+        results["encode_mp4"], path = timed(encode_mp4, repeat)
+        results["encode_mp4"]["encoder"] = "ffmpeg" if path.endswith(".mp4") else "raw"
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    recorder = ScreenRecorder(file_manager, backend_factory=backend_factory)
+    recorder.start_recording(1)
+    time.sleep(record_seconds)
+    done = []
+    stop = time.perf_counter()
+    recorder.stop_recording(callback=done.append)
+    while not done:
+        time.sleep(0.01)
+    results["end_to_end"] = {"record_seconds": record_seconds,
+                             "stop_to_saved_ms": round((time.perf_counter() - stop) * 1000, 3),
+                             **recorder.stats.as_dict()}
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LightShot pipeline benchmark")
+    parser.add_argument("--backend", choices=["synthetic", "mss"], default="synthetic")
+    parser.add_argument("--resolution", default="1920x1080")
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--change-rate", type=float, default=0.3)
+    parser.add_argument("--record-seconds", type=float, default=2.0)
+    parser.add_argument("--output")
+    args = parser.parse_args(argv)
+
+    width, height = (int(v) for v in args.resolution.lower().split("x"))
+    if args.backend == "synthetic":
+        backend_factory = lambda: SyntheticBackend(width, height, change_rate=args.change_rate)
+    else:
+        backend_factory = MssBackend
+
+    base_dir = tempfile.mkdtemp()
+    # Pipeline messages go to stderr so stdout stays valid JSON
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            file_manager = FileManager(base_dir)
+            report = {
+                "meta": {
+                    "timestamp": datetime.now().isoformat(),
+                    "python": platform.python_version(),
+                    "pillow": PIL.__version__,
+                    "platform": platform.platform(),
+                    "cpus": os.cpu_count(),
+                    "backend": args.backend,
+                    "resolution": [width, height],
+                    "frames": args.frames,
+                    "change_rate": args.change_rate,
+                },
+                "screenshot": bench_screenshot(backend_factory, file_manager, args.repeat),
+                "recording": bench_recording(backend_factory, file_manager, args.frames, args.repeat, args.record_seconds),
+            }
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+    text = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+    return report
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
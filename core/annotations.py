@@ -0,0 +1,146 @@
+from core.frame import Frame
+from utils.image_processor import ImageProcessor
+
+TILE = 128 # Undo snapshot granularity, in pixels
+
+class Annotation:
+    """
+    One editor command: blur, rect, arrow, line, pen, text or watermark,
+    in image coordinates. Replaying it onto the same pixels gives the same
+    result, so redo is just draw() again.
+    """
+    __slots__ = ("kind", "points", "color", "width", "text")
+
+    def __init__(self, kind, points=(), color=(255, 0, 0), width=3, text=""):
+        self.kind = kind
+        self.points = [tuple(p) for p in points]
+        self.color = color
+        self.width = width
+        self.text = text
+
+    def bbox(self, size):
+        """(l, t, r, b) that draw() can change on an image of `size`, clipped to it, or None if empty."""
+        if self.kind == "watermark":
+            box = ImageProcessor.watermark_box(size, self.text)
+        elif self.kind == "text":
+            x, y = self.points[0]
+            l, t, r, b = ImageProcessor.load_font(24).getbbox(self.text)
+            box = (x + l - 2, y + t - 2, x + r + 2, y + b + 2)
+        else:
+            xs, ys = [p[0] for p in self.points], [p[1] for p in self.points]
+            pad = 0 if self.kind == "blur" else self.width + (16 if self.kind == "arrow" else 2) # Arrowheads overhang the end point
+            box = (min(xs) - pad, min(ys) - pad, max(xs) + pad + 1, max(ys) + pad + 1)
+        l, t = max(0, int(box[0])), max(0, int(box[1]))
+        r, b = min(size[0], int(box[2]) + 1), min(size[1], int(box[3]) + 1)
+        return (l, t, r, b) if r > l and b > t else None
+
+    def draw(self, image):
+        if self.kind == "blur":
+            ImageProcessor.apply_blur(image, self.points[0] + self.points[1])
+        elif self.kind == "watermark":
+            ImageProcessor.add_watermark(image, self.text, timestamp=False)
+        elif self.kind == "pen":
+            ImageProcessor.draw_annotation(image, "pen", None, None, self.color, self.width, points=self.points)
+        elif self.kind == "text":
+            ImageProcessor.draw_annotation(image, "text", self.points[0], None, self.color, text=self.text)
+        else:
+            ImageProcessor.draw_annotation(image, self.kind, self.points[0], self.points[1], self.color, self.width)
+
+class AnnotationDocument:
+    """
+    Editor state: a list of Annotations over an immutable base Frame.
+
+    The commands are drawn, in order, into one composite image that is
+    copied from the base on the first edit. Before a command draws, the
+    TILE x TILE tiles under its bounding box are saved. Undo pastes them
+    back, and redo replays the command. So an undo step costs memory in
+    proportion to the area it touched, never a copy of the screenshot.
+    Every change returns its dirty box, so the display only has to
+    redraw that area.
+    """
+    def __init__(self, base, tile=TILE):
+        self.base = Frame.of(base)
+        self.size = (self.base.width, self.base.height)
+        self.tile = tile
+        self.image = None # Composite of base and commands; None until the first edit
+        self.shared = False # The composite went out with flatten(); copy it before drawing again
+        self.done = [] # [(command, [(tile box, saved tile)])], oldest first
+        self.undone = [] # Commands to redo, most recently undone last
+
+    @property
+    def commands(self):
+        return [command for command, _ in self.done]
+
+    @property
+    def edited(self):
+        return bool(self.done)
+
+    @property
+    def can_undo(self):
+        return bool(self.done)
+
+    @property
+    def can_redo(self):
+        return bool(self.undone)
+
+    def _writable(self):
+        if self.image is None:
+            self.image = self.base.pil().copy()
+        elif self.shared:
+            self.image, self.shared = self.image.copy(), False
+        return self.image
+
+    def _tiles(self, box):
+        l, t, r, b = box
+        w, h, n = self.size[0], self.size[1], self.tile
+        return [(x, y, min(x + n, w), min(y + n, h)) for y in range(t - t % n, b, n) for x in range(l - l % n, r, n)]
+
+    def _draw(self, command):
+        box = command.bbox(self.size)
+        if box is None:
+            return None
+        image = self._writable()
+        self.done.append((command, [(tile, image.crop(tile)) for tile in self._tiles(box)]))
+        command.draw(image)
+        return box
+
+    def apply(self, command):
+        """Draws a new command; returns its dirty box, or None if it can't change anything. Clears redo."""
+        box = self._draw(command)
+        if box is not None:
+            self.undone.clear()
+        return box
+
+    def undo(self):
+        """Reverts the last command; returns the dirty box, or None if there is nothing to undo."""
+        if not self.done:
+            return None
+        command, tiles = self.done.pop()
+        image = self._writable()
+        for tile, saved in tiles:
+            image.paste(saved, tile[:2])
+        self.undone.append(command)
+        return command.bbox(self.size)
+
+    def redo(self):
+        """Replays the last undone command; returns the dirty box, or None if there is nothing to redo."""
+        return self._draw(self.undone.pop()) if self.undone else None
+
+    def view(self):
+        """Current pixels as a PIL image, for display only; don't draw on it."""
+        return self.image if self.image is not None else self.base.pil()
+
+    def undo_bytes(self):
+        """Memory held by undo snapshots."""
+        return sum(saved.width * saved.height * len(saved.getbands()) for _, tiles in self.done for _, saved in tiles)
+
+    def flatten(self):
+        """
+        The edited screenshot as a Frame, for saving or copying. It is the
+        base itself when nothing is drawn, otherwise the composite, handed
+        over without a copy. The next edit copies it first (copy-on-write).
+        """
+        if self.image is None:
+            return self.base
+        self.shared = True
+        return Frame.from_pil(self.image)
@@ -0,0 +1,139 @@
+import random
+
+class CaptureBackend:
+    """
+    Screen grabbing interface shared by CaptureManager and ScreenRecorder.
+    Mirrors the parts of mss they use: `monitors` (index 0 is the whole
+    virtual screen), `grab(region)` returning an object with .raw, .bgra,
+    .size and .pos, and `close()`. Handles are not shared across threads;
+    open one per thread.
+    """
+    monitors = []
+
+    def grab(self, region):
+        raise NotImplementedError
+
+    def close(self): pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class MssBackend(CaptureBackend):
+    """Real screen capture through mss."""
+    def __init__(self):
+        import mss
+        self.sct = mss.mss()
+
+    @property
+    def monitors(self):
+        return self.sct.monitors
+
+    def grab(self, region):
+        return self.sct.grab(region)
+
+    def close(self):
+        self.sct.close()
+
+class SyntheticShot:
+    """Grab result with the same fields as mss.screenshot.ScreenShot."""
+    __slots__ = ("raw", "size", "pos")
+
+    def __init__(self, raw, width, height, left, top):
+        self.raw = raw
+        self.size = (width, height)
+        self.pos = (left, top)
+
+    @property
+    def width(self):
+        return self.size[0]
+
+    @property
+    def height(self):
+        return self.size[1]
+
+    @property
+    def bgra(self):
+        return bytes(self.raw)
+
+class SyntheticBackend(CaptureBackend):
+    """
+    Deterministic frames for headless benchmarks and tests. The virtual
+    screen is `count` monitors of width x height side by side (or one per
+    (w, h) in `sizes`, top-aligned), filled with a fixed tiled pattern. A box moves `motion` pixels per changing grab.
+    Each grab changes with probability `change_rate`, drawn from a seeded
+    RNG, so the same arguments always give the same frame sequence.
+    """
+    def __init__(self, width=1920, height=1080, count=1, motion=16, change_rate=1.0, box=(200, 120), seed=0, sizes=None):
+        sizes = sizes or [(width, height)] * count
+        self.width, self.height = sum(w for w, _ in sizes), max(h for _, h in sizes)
+        self.motion = motion
+        self.change_rate = change_rate
+        self.box_w, self.box_h = box
+        self.rng = random.Random(seed)
+        self.grabs = 0
+        self.offset = 0
+
+        total_w, height = self.width, self.height
+        self._monitors = [{"left": 0, "top": 0, "width": total_w, "height": height}]
+        left = 0
+        for w, h in sizes:
+            self._monitors.append({"left": left, "top": 0, "width": w, "height": h})
+            left += w
+
+        tile = bytearray()
+        for x in range(64):
+            shade = 40 + (x // 8) * 8
+            tile += bytes((shade, shade, 48, 255))
+        row = bytes(tile) * (total_w // 64) + bytes(tile[:(total_w % 64) * 4])
+        self.stride = total_w * 4
+        self.background = bytearray()
+        for y in range(height):
+            self.background += row if (y // 32) % 2 else row[4 * 32:] + row[:4 * 32]
+        self.canvas = bytearray(self.background)
+        self._draw_box()
+
+    @property
+    def monitors(self):
+        return self._monitors
+
+    def _box_rect(self):
+        span_w = max(1, self.stride // 4 - self.box_w)
+        span_h = max(1, self.height - self.box_h)
+        return self.offset % span_w, (self.offset // 3) % span_h
+
+    def _draw_box(self, color=b"\x30\x90\xe0\xff"):
+        x, y = self._box_rect()
+        line = color * min(self.box_w, self.stride // 4 - x)
+        for row in range(y, min(self.height, y + self.box_h)):
+            start = row * self.stride + x * 4
+            self.canvas[start:start + len(line)] = line
+
+    def _erase_box(self):
+        x, y = self._box_rect()
+        width = min(self.box_w, self.stride // 4 - x) * 4
+        for row in range(y, min(self.height, y + self.box_h)):
+            start = row * self.stride + x * 4
+            self.canvas[start:start + width] = self.background[start:start + width]
+
+    def grab(self, region):
+        self.grabs += 1
+        if self.rng.random() < self.change_rate:
+            self._erase_box()
+            self.offset += self.motion
+            self._draw_box()
+
+        left = max(0, region["left"] - self._monitors[0]["left"])
+        top = max(0, region["top"] - self._monitors[0]["top"])
+        width = max(0, min(region["width"], self.stride // 4 - left))
+        height = max(0, min(region["height"], self.height - top))
+        if left == 0 and width * 4 == self.stride:
+            raw = self.canvas[top * self.stride:(top + height) * self.stride]
+        else:
+            raw = bytearray()
+            for row in range(top, top + height):
+                start = row * self.stride + left * 4
+                raw += self.canvas[start:start + width * 4]
+        return SyntheticShot(raw, width, height, region["left"], region["top"])
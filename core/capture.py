@@ -1,11 +1,35 @@
-import mss
-import mss.tools
 from PIL import Image
 import os
+import time
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from core.backends import MssBackend
+from core.frame import Frame
+from utils.frame_ops import to_pil
 
 class CaptureManager:
-    def __init__(self):
-        self.sct = mss.mss()
+    """
+    Synchronous capture API. mss handles can't be shared across threads, so
+    each calling thread gets its own handle, created on first use and then
+    reused for every later capture on that thread.
+    """
+    def __init__(self, backend_factory=MssBackend):
+        self.backend_factory = backend_factory
+        self._local = threading.local()
+        self._handles = []
+        self._lock = threading.Lock()
+        self._pool = None # Per-monitor grab threads, created on first use
+
+    @property
+    def sct(self):
+        """The calling thread's backend handle."""
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = self._local.sct = self.backend_factory()
+            with self._lock:
+                self._handles.append(sct)
+        return sct
 
     def get_monitors(self):
         """Returns a list of all monitors."""
@@ -18,15 +42,61 @@ class CaptureManager:
         """
         monitor = self.sct.monitors[monitor_index]
         sct_img = self.sct.grab(monitor)
-        img = Image.frombytes("RGB", sct_img.size, sct_img.bgra, "raw", "BGRX")
-        return img
+        return to_pil(sct_img.raw, sct_img.size)
+
+    def grab_raw(self, monitor_index=0):
+        """
+        Grabs a monitor (0 = whole virtual screen) and returns the backend's
+        shot with its BGRA buffer, unconverted. Pair with crop_shot.
+        """
+        return self.sct.grab(self.sct.monitors[monitor_index])
+
+    @staticmethod
+    def crop_shot(shot, x, y, width, height):
+        """
+        Crops a grab_raw shot to a Frame. x, y are relative to the shot and
+        clamped to it. The crop is a window over the shot's buffer; pixels
+        are only decoded when a consumer asks for a view.
+        """
+        return Frame.from_shot(shot).cropped(x, y, x + width, y + height)
+
+    def capture_frame(self, monitor_index=1):
+        """Like capture_full_screen, but returns an unconverted Frame."""
+        return Frame.from_shot(self.grab_raw(monitor_index))
+
+    def _grab_monitor(self, monitor):
+        sct_img = self.sct.grab(monitor)
+        return to_pil(sct_img.raw, sct_img.size)
+
+    def capture_all_monitors(self, separate=False):
+        """
+        Grabs every monitor at the same time on its own thread, instead of
+        one grab of the whole virtual screen. By default the results are
+        pasted at their virtual coordinates into one canvas allocated before
+        the grabs start, and gaps between monitors of different sizes stay
+        black. separate=True returns the per-monitor images in
+        get_monitors()[1:] order instead.
+        """
+        vscr, monitors = self.sct.monitors[0], self.sct.monitors[1:]
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=max(1, len(monitors)), thread_name_prefix="monitor")
+        futures = [self._pool.submit(self._grab_monitor, m) for m in monitors]
+        if separate:
+            return [f.result() for f in futures]
+
+        canvas = Image.new("RGB", (vscr["width"], vscr["height"]))
+        for monitor, future in zip(monitors, futures):
+            canvas.paste(future.result(), (monitor["left"] - vscr["left"], monitor["top"] - vscr["top"]))
+        return canvas
+
+    def grab_region(self, x, y, width, height):
+        """Grabs a screen region and returns the backend's unconverted shot."""
+        return self.sct.grab({"top": y, "left": x, "width": width, "height": height})
 
     def capture_region(self, x, y, width, height):
         """Captures a specific screen region."""
-        region = {"top": y, "left": x, "width": width, "height": height}
-        sct_img = self.sct.grab(region)
-        img = Image.frombytes("RGB", sct_img.size, sct_img.bgra, "raw", "BGRX")
-        return img
+        sct_img = self.grab_region(x, y, width, height)
+        return to_pil(sct_img.raw, sct_img.size)
 
     def capture_active_window(self):
         """
@@ -46,4 +116,86 @@ class CaptureManager:
             return self.capture_full_screen(1)
 
     def close(self):
-        self.sct.close()
+        if self._pool:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        with self._lock:
+            handles, self._handles = self._handles, []
+        for sct in handles:
+            try: sct.close()
+            except Exception: pass
+        self._local = threading.local()
+
+class CaptureService:
+    """
+    Runs captures for the Tk thread, the hotkey thread and the recorder on a
+    small pool of long-lived workers. Each worker keeps its own handle
+    through CaptureManager. Requests go through a queue and return
+    concurrent.futures.Future objects, so callers never block on a grab.
+    """
+    def __init__(self, capture_manager=None, workers=2):
+        self.capture_manager = capture_manager or CaptureManager()
+        self.requests = queue.Queue()
+        self.threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(workers)]
+        for t in self.threads:
+            t.start()
+
+    def submit(self, fn, *args):
+        """Queues fn(capture_manager, *args); returns a Future for its result."""
+        future = Future()
+        self.requests.put((future, fn, args))
+        return future
+
+    def _worker(self):
+        while True:
+            item = self.requests.get()
+            if item is None:
+                break
+            future, fn, args = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(self.capture_manager, *args))
+            except Exception as e:
+                future.set_exception(e)
+
+    def capture_full_screen(self, monitor_index=0):
+        return self.submit(CaptureManager.capture_full_screen, monitor_index)
+
+    def capture_region(self, x, y, width, height):
+        return self.submit(CaptureManager.capture_region, x, y, width, height)
+
+    def grab(self, region):
+        """Raw grab (mss ScreenShot-like object), left unconverted."""
+        return self.submit(lambda cm, r: cm.sct.grab(r), region)
+
+    def burst(self, region, count, interval=0.0):
+        """
+        Grabs `region` count times, `interval` seconds apart, on one worker.
+        Returns one Future per shot; each resolves as soon as its grab is done.
+        """
+        futures = [Future() for _ in range(count)]
+
+        def run(cm):
+            next_at = time.monotonic()
+            for future in futures:
+                delay = next_at - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                next_at += interval
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    sct_img = cm.sct.grab(region)
+                    future.set_result(to_pil(sct_img.raw, sct_img.size))
+                except Exception as e:
+                    future.set_exception(e)
+        self.submit(run)
+        return futures
+
+    def close(self):
+        for _ in self.threads:
+            self.requests.put(None)
+        for t in self.threads:
+            t.join(timeout=1)
+        self.capture_manager.close()
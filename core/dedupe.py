@@ -0,0 +1,191 @@
+import os
+import threading
+from collections import defaultdict, deque
+from itertools import islice
+from datetime import datetime
+from PIL import Image
+from core.frame import Frame
+
+MASK64 = (1 << 64) - 1
+IMAGE_TYPES = (".png", ".jpg", ".jpeg", ".webp", ".bmp", ".qoi")
+BAND_CANDIDATES = 64 # Hashes checked per band; bounds lookups inside a tight cluster
+
+def dhash(image):
+    """
+    64-bit difference hash: the image shrunk to 9x8 grey, one bit per
+    horizontal neighbour pair (left brighter than right). Frames and PIL
+    images both work. Pillow shrinks by an integer factor first, so a 4K
+    frame costs a few milliseconds, next to hundreds for its PNG encode.
+    """
+    img = Frame.of(image).pil()
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    px = img.resize((9, 8), Image.BOX, reducing_gap=2.0).convert("L").tobytes()
+    h = 0
+    for row in range(8):
+        for col in range(8):
+            h = (h << 1) | (px[row * 9 + col] > px[row * 9 + col + 1])
+    return h
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+def to_signed(h):
+    """SQLite integers are signed 64-bit."""
+    return h - (1 << 64) if h >= 1 << 63 else h
+
+class HashIndex:
+    """
+    Hamming-radius lookup over 64-bit hashes by multi-index hashing. Each
+    hash is cut into radius + 1 bands, and two hashes at most `radius` bits
+    apart agree exactly on at least one band, so a lookup is radius + 1
+    dict probes plus a popcount per candidate. Unlike a BK-tree, lookup
+    cost doesn't grow with the tree depth, so it stays well under a
+    millisecond at 100k entries. Each hash keeps only the newest item
+    added with it, so repeated captures of one screen don't grow a
+    bucket that every lookup would walk.
+
+    Hashes of one desktop sit close together and share bands, so at most
+    `candidates` hashes (None: no limit) are checked per band. A lookup inside a large
+    cluster can then miss some matches within radius, but never takes
+    longer than (radius + 1) * candidates popcounts.
+    """
+    def __init__(self, radius=4, candidates=BAND_CANDIDATES):
+        self.candidates = candidates
+        self.radius = radius = max(0, min(63, radius)) # At most 64 one-bit bands
+        bands = radius + 1
+        edges = [i * 64 // bands for i in range(bands + 1)] # Exactly radius + 1 bands, widths differing by at most 1
+        self.bands = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(edges, edges[1:])]
+        self.tables = [defaultdict(set) for _ in self.bands]
+        self.items = {} # hash -> newest item added with it
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, h, item):
+        if h not in self.items:
+            for table, (shift, mask) in zip(self.tables, self.bands):
+                table[(h >> shift) & mask].add(h)
+        self.items[h] = item
+
+    def remove(self, h):
+        if self.items.pop(h, None) is None:
+            return
+        for table, (shift, mask) in zip(self.tables, self.bands):
+            key = (h >> shift) & mask
+            bucket = table[key]
+            bucket.discard(h)
+            if not bucket:
+                del table[key]
+
+    def search(self, h, radius=None):
+        """[(distance, item)] within radius (at most the index's), nearest first."""
+        radius = self.radius if radius is None else min(radius, self.radius)
+        candidates = set()
+        for table, (shift, mask) in zip(self.tables, self.bands):
+            candidates.update(islice(table.get((h >> shift) & mask, ()), self.candidates))
+        found = []
+        for c in candidates:
+            d = hamming(h, c)
+            if d <= radius:
+                found.append((d, self.items[c]))
+        found.sort(key=lambda f: f[0])
+        return found
+
+class DuplicateFinder:
+    """
+    Near-duplicate lookup over the perceptual hashes in the history index.
+    Only rows saved at or after the window start (`since`) are indexed.
+    Before each search, rows added since the last lookup, by this or
+    another instance, are read in by id, and rows that fell out of the
+    window are evicted, so the index stays the size of the window.
+    """
+    def __init__(self, history, radius=4):
+        self.history = history
+        self.index = HashIndex(radius)
+        self.order = deque() # (timestamp, hash) in the order they were indexed
+        self.last_id = 0
+        self.since = None
+        self.lock = threading.Lock()
+
+    def _sync(self, since):
+        if since and self.since and since < self.since:
+            # The window grew (config change); rows already skipped are needed again
+            self.index, self.order, self.last_id = HashIndex(self.index.radius, self.index.candidates), deque(), 0
+        self.since = since
+        for row in self.history.hashes(after_id=self.last_id, since=since):
+            h = row["phash"] & MASK64
+            self.index.add(h, (row["path"], row["timestamp"]))
+            self.order.append((row["timestamp"], h))
+            self.last_id = row["id"]
+        while since and self.order and self.order[0][0] < since:
+            timestamp, h = self.order.popleft()
+            if self.index.items.get(h, (None, None))[1] == timestamp: # Not replaced by a newer save
+                self.index.remove(h)
+
+    def find(self, h, radius=None, since=None, exclude=None):
+        """Path of the nearest saved file within radius of h, saved at or after `since`, that still exists; else None."""
+        since = since.isoformat() if isinstance(since, datetime) else since
+        with self.lock:
+            self._sync(since)
+            matches = self.index.search(h, radius)
+        for _, (path, timestamp) in matches:
+            if since and timestamp < since:
+                continue
+            if path != exclude and os.path.exists(path):
+                return path
+        return None
+
+def _link(src, dst):
+    """Replaces dst with a hard link to src, so both names share one copy on disk."""
+    tmp = dst + ".tmp"
+    os.link(src, tmp)
+    os.replace(tmp, dst)
+
+def dedupe_folder(file_manager, folder, radius=4, action="report"):
+    """
+    Finds near-duplicate images under `folder`, keeping the oldest (by
+    modification time) of each group. action is "report" (change nothing),
+    "link" (replace duplicates with hard links to the kept file) or
+    "delete". Deleted files are dropped from the history index.
+    Returns {"scanned", "duplicates": [(duplicate, kept, distance)], "bytes"}.
+    """
+    found = []
+    for root, _, names in os.walk(folder):
+        for name in names:
+            if os.path.splitext(name)[1].lower() in IMAGE_TYPES:
+                path = os.path.join(root, name)
+                try:
+                    found.append((os.path.getmtime(path), path))
+                except OSError:
+                    continue # Deleted while scanning
+    paths = [path for _, path in sorted(found)]
+
+    index, duplicates, reclaimed = HashIndex(radius), [], 0
+    for path in paths:
+        try:
+            with Image.open(path) as img:
+                img.draft("RGB", (img.width // 8, img.height // 8)) # JPEGs decode at 1/8 scale
+                h = dhash(img)
+        except Exception as e:
+            print(f"Dedupe: skipping {path}: {e}")
+            continue
+        match = index.search(h)
+        if not match:
+            index.add(h, path)
+            continue
+        distance, kept = match[0]
+        duplicates.append((path, kept, distance))
+        try:
+            if action == "report" or os.path.samefile(path, kept):
+                continue
+            size = os.path.getsize(path)
+            if action == "link":
+                _link(kept, path)
+            elif action == "delete":
+                os.remove(path)
+                file_manager.history.remove_path(path)
+            reclaimed += size
+        except OSError as e:
+            print(f"Dedupe Error: {path}: {e}")
+    return {"scanned": len(paths), "duplicates": duplicates, "bytes": reclaimed}
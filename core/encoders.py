@@ -0,0 +1,113 @@
+import io
+import sys
+import time
+from PIL import Image
+
+PROFILES = ("fastest", "balanced", "smallest")
+FORMATS = ("png", "webp", "qoi", "jpeg")
+LOSSLESS = ("png", "webp", "qoi")
+
+# Pillow save() arguments per format and profile. PNG exposes zlib effort
+# (Pillow picks the row filters itself); WebP lossless trades `method` and
+# `quality` (effort) for size. QOI has no knobs; it's only fast where
+# Pillow's writer is native, which the benchmark will show. JPEG and lossy
+# WebP take quality from the config.
+PARAMS = {
+    "png": {
+        "fastest": {"compress_level": 1},
+        "balanced": {"compress_level": 6},
+        "smallest": {"compress_level": 9, "optimize": True},
+    },
+    "webp": {
+        "fastest": {"lossless": True, "method": 0, "quality": 0},
+        "balanced": {"lossless": True, "method": 4, "quality": 50},
+        "smallest": {"lossless": True, "method": 6, "quality": 100},
+    },
+    "webp_lossy": {
+        "fastest": {"method": 0},
+        "balanced": {"method": 4},
+        "smallest": {"method": 6},
+    },
+    "qoi": {"fastest": {}, "balanced": {}, "smallest": {}},
+    "jpeg": {
+        "fastest": {},
+        "balanced": {"optimize": True},
+        "smallest": {"optimize": True, "progressive": True},
+    },
+}
+
+def available(fmt):
+    """Whether this Pillow build can write `fmt` (QOI needs a recent Pillow, WebP needs libwebp)."""
+    Image.init()
+    return normalize(fmt)[0].upper() in Image.SAVE
+
+def normalize(fmt):
+    fmt = fmt.lower()
+    return ("jpeg", "jpg") if fmt in ("jpg", "jpeg") else (fmt, fmt)
+
+def save_params(fmt, profile="balanced", quality=95, lossless=True):
+    """(Pillow format, save() kwargs) for a format and profile."""
+    fmt = normalize(fmt)[0]
+    profile = profile if profile in PROFILES else "balanced"
+    if fmt == "webp" and not lossless:
+        return "WEBP", dict(PARAMS["webp_lossy"][profile], quality=quality)
+    if fmt == "jpeg":
+        return "JPEG", dict(PARAMS["jpeg"][profile], quality=quality)
+    return fmt.upper(), dict(PARAMS.get(fmt, {}).get(profile, {}))
+
+def encode(img, fmt, profile="balanced", quality=95, lossless=True):
+    pil_format, params = save_params(fmt, profile, quality, lossless)
+    if img.mode not in ("RGB", "L") and pil_format == "JPEG":
+        img = img.convert("RGB")
+    out = io.BytesIO()
+    img.save(out, pil_format, **params)
+    return out.getbuffer()
+
+def _samples(file_manager, count):
+    images = []
+    for entry in file_manager.get_history(type=LOSSLESS + ("jpg", "jpeg"), newest_first=True, limit=count * 4):
+        try:
+            with Image.open(entry["path"]) as img:
+                images.append(img.convert("RGB"))
+        except Exception:
+            continue # Deleted or unreadable; try the next one
+        if len(images) >= count:
+            break
+    return images
+
+def benchmark(file_manager, samples=5, budget_ms=None, formats=None):
+    """
+    Encodes the newest `samples` screenshots from the user's history with
+    each lossless format in `formats` (default: all) that this Pillow
+    build can write, in every profile. Suggests the smallest
+    output whose mean encode time per screenshot stays within budget_ms
+    (config "encode_budget_ms"), or the fastest if none does.
+    Returns {"samples", "results": [...], "suggestion": (format, profile) or None}.
+    """
+    budget_ms = budget_ms or file_manager.config.get("encode_budget_ms", 200)
+    images = _samples(file_manager, samples)
+    results = []
+    for fmt in [f for f in LOSSLESS if f in (formats or LOSSLESS) and available(f)]:
+        for profile in PROFILES:
+            if fmt == "qoi" and profile != "fastest":
+                continue # Identical settings
+            start, size = time.perf_counter(), 0
+            for img in images:
+                size += len(encode(img, fmt, profile))
+            elapsed = (time.perf_counter() - start) * 1000
+            results.append({"format": fmt, "profile": profile, "ms": round(elapsed / max(1, len(images)), 1),
+                            "kb": round(size / max(1, len(images)) / 1024, 1)})
+    suggestion = None
+    if images and results:
+        within = [r for r in results if r["ms"] <= budget_ms]
+        best = min(within, key=lambda r: r["kb"]) if within else min(results, key=lambda r: r["ms"])
+        suggestion = (best["format"], best["profile"])
+    return {"samples": len(images), "budget_ms": budget_ms, "results": results, "suggestion": suggestion}
+
+if __name__ == "__main__":
+    from core.manager import FileManager
+    report = benchmark(FileManager(sys.argv[1] if len(sys.argv) > 1 else None))
+    print(f"{report['samples']} screenshots from history, budget {report['budget_ms']} ms")
+    for r in report["results"]:
+        print(f"{r['format']:>5} {r['profile']:<9} {r['ms']:8.1f} ms {r['kb']:10.1f} KB")
+    print(f"Suggested: {' / '.join(report['suggestion'])}" if report["suggestion"] else "No screenshots to sample yet")
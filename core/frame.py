@@ -0,0 +1,131 @@
+import io
+import time
+import struct
+from collections import Counter
+from PIL import Image
+from utils.frame_ops import HAS_NUMPY, to_pil, to_rgb_array
+
+# Full-image copies made by Frame views, by kind. Reset with COPIES.clear().
+COPIES = Counter()
+
+class Frame:
+    """
+    A captured image that stays in the grab's BGRA buffer until a consumer
+    asks for something else. `buf` is a memoryview over the backend's
+    buffer (no copy); `crop` selects a (left, top, right, bottom) window of
+    it, so cropping a frame is free too.
+
+    Each view (pil, array, dib, png, fit) is built at most once per frame
+    and shared by every consumer; each build counts one full-image copy in
+    COPIES. Views are shared, so code that draws on frame.pil() must wrap
+    the result in a new Frame (Frame.of) before asking for other views.
+    """
+    __slots__ = ("buf", "size", "crop", "pos", "timestamp", "_pil", "_array", "_dib", "_encoded", "_fit")
+
+    def __init__(self, buf, size, crop=None, pos=(0, 0), timestamp=None):
+        self.buf = memoryview(buf) if buf is not None else None
+        self.size = size
+        self.crop = crop or (0, 0, size[0], size[1])
+        self.pos = pos
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self._pil = self._array = self._dib = self._encoded = self._fit = None
+
+    @classmethod
+    def from_shot(cls, shot, crop=None, timestamp=None):
+        """Wraps a backend grab result without copying its pixels."""
+        return cls(shot.raw, shot.size, crop, shot.pos, timestamp)
+
+    @classmethod
+    def from_pil(cls, img, timestamp=None):
+        """Wraps an existing PIL image, e.g. after an edit. The PIL view is the image itself."""
+        frame = cls(None, img.size, timestamp=timestamp)
+        frame._pil = img
+        return frame
+
+    @classmethod
+    def of(cls, image):
+        """Frame passthrough; PIL images are wrapped with from_pil."""
+        return image if isinstance(image, Frame) else cls.from_pil(image)
+
+    @property
+    def width(self):
+        return self.crop[2] - self.crop[0]
+
+    @property
+    def height(self):
+        return self.crop[3] - self.crop[1]
+
+    def cropped(self, left, top, right, bottom):
+        """Sub-frame over the same buffer; coordinates are relative to this frame and clamped."""
+        l0, t0 = self.crop[:2]
+        l, t = max(0, min(left, self.width)), max(0, min(top, self.height))
+        r, b = max(l, min(right, self.width)), max(t, min(bottom, self.height))
+        if self.buf is None:
+            return Frame.from_pil(self.pil().crop((l, t, r, b)), self.timestamp)
+        return Frame(self.buf, self.size, (l0 + l, t0 + t, l0 + r, t0 + b), self.pos, self.timestamp)
+
+    def pil(self):
+        """RGB PIL image, decoded straight from the (cropped) buffer."""
+        if self._pil is None:
+            self._pil = to_pil(self.buf, self.size, crop=self.crop)
+            COPIES["pil"] += 1
+        return self._pil
+
+    def array(self):
+        """Contiguous (h, w, 3) RGB NumPy array."""
+        if not HAS_NUMPY:
+            raise RuntimeError("NumPy is not installed")
+        if self._array is None:
+            if self.buf is None:
+                import numpy as np
+                self._array = np.asarray(self._pil.convert("RGB"))
+            else:
+                self._array = to_rgb_array(self.buf, self.size, crop=self.crop)
+            COPIES["array"] += 1
+        return self._array
+
+    def dib(self):
+        """
+        CF_DIB clipboard bytes: BITMAPINFOHEADER + bottom-up 32-bit rows.
+        From a buffer this is one pass over the BGRA rows, with no PIL
+        image and no BMP file to slice.
+        """
+        if self._dib is None:
+            w, h = self.width, self.height
+            header = struct.pack("<IiiHHIIiiII", 40, w, h, 1, 32, 0, w * h * 4, 0, 0, 0, 0)
+            if self.buf is None:
+                self._dib = header + self._pil.convert("RGB").tobytes("raw", ("BGRX", 0, -1))
+            else:
+                stride = self.size[0] * 4
+                l, t = self.crop[:2]
+                rows = [self.buf[(t + y) * stride + l * 4:(t + y) * stride + (l + w) * 4] for y in range(h - 1, -1, -1)]
+                self._dib = b"".join([header] + rows)
+            COPIES["dib"] += 1
+        return self._dib
+
+    def encoded(self, fmt, **params):
+        """
+        The frame encoded with Pillow's `fmt` writer and save() params,
+        shared by every writer of this frame. Cached for the last settings.
+        """
+        key = (fmt.upper(), sorted(params.items()))
+        if self._encoded is None or self._encoded[0] != key:
+            out = io.BytesIO()
+            self.pil().save(out, fmt, **params)
+            self._encoded = (key, out.getbuffer())
+            COPIES[fmt.lower()] += 1
+        return self._encoded[1]
+
+    def png(self, **params):
+        return self.encoded("PNG", **params)
+
+    def fit(self, max_w, max_h):
+        """(image, scale) no larger than max_w x max_h, for display. Cached for the last bounds."""
+        if self._fit is None or self._fit[0] != (max_w, max_h):
+            img, scale = self.pil(), 1.0
+            if img.width > max_w or img.height > max_h:
+                scale = min(max_w / img.width, max_h / img.height)
+                img = img.resize((int(img.width * scale), int(img.height * scale)), Image.Resampling.LANCZOS)
+                COPIES["fit"] += 1
+            self._fit = ((max_w, max_h), img, scale)
+        return self._fit[1], self._fit[2]
@@ -0,0 +1,199 @@
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    type TEXT NOT NULL,
+    size INTEGER NOT NULL DEFAULT 0,
+    extra TEXT,
+    phash INTEGER
+);
+CREATE INDEX IF NOT EXISTS history_timestamp ON history (timestamp);
+CREATE INDEX IF NOT EXISTS history_type ON history (type, timestamp);
+CREATE INDEX IF NOT EXISTS history_path ON history (path);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+# Columns returned for every entry; anything else lives in `extra` as JSON
+COLUMNS = ("id", "path", "filename", "timestamp", "type", "size")
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+class HistoryStore:
+    """
+    Capture history in SQLite, in WAL mode. Adding an entry is a single
+    INSERT, however long the history gets. Readers never block the writer,
+    and several app instances can share one file; each waits up to
+    `timeout` seconds for another's write lock. Connections are opened
+    per thread.
+
+    On first open, an existing history.json next to the database is
+    imported once and renamed to history.json.migrated.
+    """
+    def __init__(self, db_path, legacy_json=None, timeout=10.0):
+        self.db_path = db_path
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+            self._upgrade(conn)
+        if legacy_json and os.path.exists(legacy_json):
+            self._migrate_json(legacy_json)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.db_path, timeout=self.timeout)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @staticmethod
+    def _upgrade(conn):
+        # Databases from before perceptual hashes
+        if "phash" not in [r["name"] for r in conn.execute("PRAGMA table_info(history)")]:
+            try:
+                conn.execute("ALTER TABLE history ADD COLUMN phash INTEGER")
+            except sqlite3.OperationalError:
+                pass # Another instance added it first
+
+    def _migrate_json(self, legacy_json):
+        conn = self._conn()
+        try:
+            with open(legacy_json, "r") as f:
+                entries = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            entries = []
+        # BEGIN IMMEDIATE serialises instances racing to migrate; the marker makes it run once
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_json'").fetchone() is None:
+                conn.executemany(
+                    "INSERT INTO history (path, filename, timestamp, type, size, extra) VALUES (?, ?, ?, ?, ?, ?)",
+                    [self._row(e.get("path", ""), e.get("timestamp"), {k: v for k, v in e.items() if k not in ("path", "timestamp", "filename")})
+                     for e in entries if isinstance(e, dict)])
+                conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_json', ?)", (datetime.now().isoformat(),))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        try:
+            os.replace(legacy_json, legacy_json + ".migrated")
+        except OSError:
+            pass # Another instance got there first
+
+    @staticmethod
+    def _row(path, timestamp=None, metadata=None):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        kind = os.path.splitext(path)[1].lstrip(".").lower()
+        extra = json.dumps(metadata) if metadata else None
+        return (path, os.path.basename(path), timestamp or datetime.now().isoformat(), kind, size, extra)
+
+    def add(self, path, metadata=None, timestamp=None, phash=None):
+        """Appends one entry and returns its id. phash is a signed 64-bit perceptual hash (see core.dedupe)."""
+        with self._conn() as conn:
+            cur = conn.execute("INSERT INTO history (path, filename, timestamp, type, size, extra, phash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               self._row(path, timestamp, metadata) + (phash,))
+            return cur.lastrowid
+
+    def _where(self, start=None, end=None, type=None, min_size=None, max_size=None, before_id=None):
+        clauses, args = [], []
+        if start is not None:
+            clauses.append("timestamp >= ?"); args.append(_iso(start))
+        if end is not None:
+            clauses.append("timestamp < ?"); args.append(_iso(end))
+        if type is not None:
+            types = [type] if isinstance(type, str) else list(type)
+            clauses.append(f"type IN ({', '.join('?' * len(types))})"); args.extend(t.lower() for t in types)
+        if min_size is not None:
+            clauses.append("size >= ?"); args.append(min_size)
+        if max_size is not None:
+            clauses.append("size <= ?"); args.append(max_size)
+        if before_id is not None:
+            clauses.append("id < ?"); args.append(before_id)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    @staticmethod
+    def _entry(row):
+        entry = {k: row[k] for k in COLUMNS}
+        if row["extra"]:
+            entry.update(json.loads(row["extra"]))
+        return entry
+
+    def query(self, limit=None, offset=0, newest_first=False, **filters):
+        """
+        Entries matching the filters: start/end (datetime or ISO string,
+        end exclusive), type (extension or list of them), min_size/max_size
+        in bytes, and before_id for keyset paging with newest_first=True.
+        """
+        where, args = self._where(**filters)
+        sql = f"SELECT * FROM history{where} ORDER BY id {'DESC' if newest_first else 'ASC'}"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            args += [limit, offset]
+        return [self._entry(r) for r in self._conn().execute(sql, args)]
+
+    def count(self, **filters):
+        where, args = self._where(**filters)
+        return self._conn().execute(f"SELECT COUNT(*) FROM history{where}", args).fetchone()[0]
+
+    def hashes(self, after_id=0, since=None):
+        """id, path, timestamp and phash of every hashed entry after after_id (and saved at or after since), in id order."""
+        sql, args = "SELECT id, path, timestamp, phash FROM history WHERE id > ? AND phash IS NOT NULL", [after_id]
+        if since is not None:
+            sql += " AND timestamp >= ?"; args.append(_iso(since))
+        return self._conn().execute(sql + " ORDER BY id", args).fetchall()
+
+    def files(self, older_than=None, type=None, limit=None, offset=0):
+        """
+        One row per file (a path saved several times counts once), oldest
+        last-save first: dicts with path, size, timestamp and type.
+        """
+        clauses, args = [], []
+        if type is not None:
+            types = [type] if isinstance(type, str) else list(type)
+            clauses.append(f"type IN ({', '.join('?' * len(types))})"); args.extend(t.lower() for t in types)
+        sql = "SELECT path, MAX(size) AS size, MAX(timestamp) AS timestamp, MAX(type) AS type FROM history"
+        sql += (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        sql += " GROUP BY path"
+        if older_than is not None:
+            sql += " HAVING MAX(timestamp) < ?"; args.append(_iso(older_than))
+        sql += " ORDER BY MAX(timestamp) ASC"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"; args += [limit, offset]
+        return [dict(r) for r in self._conn().execute(sql, args)]
+
+    def totals(self):
+        """(file count, total bytes), counting each path once."""
+        row = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM (SELECT MAX(size) AS size FROM history GROUP BY path)").fetchone()
+        return row[0], row[1]
+
+    def remove_path(self, path):
+        """Drops every entry for a file; returns how many there were."""
+        with self._conn() as conn:
+            return conn.execute("DELETE FROM history WHERE path = ?", (path,)).rowcount
+
+    def move_path(self, old_path, new_path):
+        """Points every entry for old_path at new_path, e.g. after a transcode, and refreshes type and size."""
+        _, filename, _, kind, size, _ = self._row(new_path)
+        with self._conn() as conn:
+            conn.execute("UPDATE history SET path = ?, filename = ?, type = ?, size = ? WHERE path = ?",
+                         (new_path, filename, kind, size, old_path))
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -1,6 +1,15 @@
 import os
 import json
-from datetime import datetime
+import atexit
+import threading
+from datetime import datetime, timedelta
+from core import encoders
+from core.dedupe import DuplicateFinder, dhash, to_signed
+from core.frame import Frame
+from core.history import HistoryStore
+from core.save_queue import SaveQueue, write_atomic
+from core.thumbnails import ThumbnailService
+from utils import png_writer
 
 class FileManager:
     def __init__(self, base_dir=None):
@@ -10,9 +19,15 @@ class FileManager:
             self.base_dir = base_dir
         
         self.config_path = os.path.join(self.base_dir, "config.json")
-        self.history_path = os.path.join(self.base_dir, "history.json")
+        self.history_path = os.path.join(self.base_dir, "history.json") # Legacy; imported into history.db
         self._ensure_dir(self.base_dir)
         self.config = self._load_config()
+        self.history = HistoryStore(os.path.join(self.base_dir, "history.db"), legacy_json=self.history_path)
+        self._saver = None # Background SaveQueue, started by the first save_async
+        self._duplicates = None # DuplicateFinder, loaded by the first save that dedupes
+        self._thumbnails = None # ThumbnailService, started on first use
+        self._reserved = set() # Names handed out by get_save_path and not yet written
+        self._names_lock = threading.Lock()
 
     def _ensure_dir(self, path):
         if not os.path.exists(path):
@@ -28,7 +43,50 @@ class FileManager:
             "quality": 95,
             "watermark_text": "",
             "enable_watermark": False,
-            "rec_format": "gif"
+            "rec_format": "gif",
+            "full_screen_monitor": 1,
+            "rec_stream": True,
+            "rec_ram_budget_mb": 512,
+            "rec_dedupe": True,
+            "rec_fps": 10,
+            "rec_adaptive_fps": True,
+            "rec_workers": 0,
+            "rec_segment_seconds": 0,
+            "rec_redact_boxes": [],
+            "rec_redact_mode": "pixelate",
+            "redact_radius": 10,
+            "redact_block": 12,
+            "replay_enabled": False,
+            "replay_seconds": 30,
+            "replay_budget_mb": 256,
+            "replay_fps": 10,
+            "timelapse_interval_ms": 1000,
+            "timelapse_policy": "coalesce",
+            "timelapse_queue": 4,
+            "watch_min_interval_ms": 250,
+            "watch_max_interval_ms": 5000,
+            "watch_threshold": 0.001,
+            "watch_tolerance": 16,
+            "watch_tile": 64,
+            "save_workers": 2,
+            "profile": "balanced",
+            "webp_lossless": True,
+            "encode_budget_ms": 200,
+            "png_parallel_pixels": 16000000,
+            "retention_enabled": False,
+            "retention_max_age_days": 0,
+            "retention_max_gb": 0,
+            "retention_max_count": 0,
+            "retention_transcode_after_days": 0,
+            "retention_transcode_format": "webp",
+            "retention_interval_minutes": 60,
+            "dedupe_mode": "off",
+            "dedupe_distance": 4,
+            "dedupe_window_minutes": 60,
+            "thumb_size": [192, 128],
+            "thumb_workers": 2,
+            "thumb_memory_mb": 64,
+            "thumb_disk_mb": 256
         }
 
     def save_config(self, config):
@@ -37,43 +95,130 @@ class FileManager:
             json.dump(self.config, f, indent=4)
 
     def get_save_path(self):
+        """
+        A new screenshot path for today. The name is reserved until a save
+        to it finishes, so threads saving in the same second (watch mode,
+        a hotkey capture) never pick the same file.
+        """
         today = datetime.now().strftime("%Y-%m-%d")
         day_dir = os.path.join(self.config["save_dir"], today)
         self._ensure_dir(day_dir)
         
         timestamp = datetime.now().strftime("%H-%M-%S")
         filename = f"screenshot_{timestamp}.{self.config['format']}"
-        return os.path.join(day_dir, filename)
+        path = os.path.join(day_dir, filename)
+        # Several saves a second (watch mode) must not overwrite each other
+        n = 1
+        with self._names_lock:
+            while os.path.exists(path) or path in self._reserved or (self._saver and self._saver.is_pending(path)):
+                path = os.path.join(day_dir, f"screenshot_{timestamp}_{n}.{self.config['format']}")
+                n += 1
+            self._reserved.add(path)
+        return path
+
+    def encode(self, image):
+        """Encodes a Frame or PIL image with the configured format and profile; returns bytes-like data."""
+        fmt, params = encoders.save_params(self.config["format"], self.config.get("profile", "balanced"),
+                                           self.config.get("quality", 95), self.config.get("webp_lossless", True))
+        frame = Frame.of(image)
+        # Huge PNGs (stitched multi-monitor captures) deflate in parallel bands; on
+        # fewer than 4 cores Pillow's single-threaded C encoder is still faster
+        if fmt == "PNG" and frame.width * frame.height >= self.config.get("png_parallel_pixels", 16000000) and (os.cpu_count() or 1) >= 4:
+            return png_writer.encode_png(frame.pil(), params.get("compress_level", 6))
+        # Frames cache their encoding, so every writer of one frame shares it
+        return frame.encoded(fmt, **params)
 
-    def save_screenshot(self, image, path=None):
+    def save_screenshot(self, image, path=None, metadata=None, dedupe=None):
+        """
+        Writes the image and returns the path it ended up at. With dedupe
+        (the default when no path is given) and config "dedupe_mode" set,
+        a near-duplicate of a capture from the last dedupe_window_minutes
+        isn't encoded: "skip" returns the earlier file's path instead,
+        "link" hard-links the earlier file at the new path.
+        """
+        if dedupe is None:
+            dedupe = path is None
         if path is None:
             path = self.get_save_path()
         
-        image.save(path, format=self.config["format"].upper(), quality=self.config["quality"])
-        self._add_to_history(path)
-        return path
+        return self._write_screenshot(image, path, metadata, dedupe)
 
-    def _add_to_history(self, file_path):
-        history = []
-        if os.path.exists(self.history_path):
-            with open(self.history_path, "r") as f:
+    def _write_screenshot(self, image, path, metadata=None, dedupe=False):
+        try:
+            return self._write_new(image, path, metadata, dedupe)
+        finally:
+            with self._names_lock:
+                self._reserved.discard(path) # Written (or skipped); the name is free to check on disk again
+
+    def _write_new(self, image, path, metadata, dedupe):
+        # Every screenshot's hash goes in the index, so turning dedupe on later finds older captures too
+        phash = dhash(image)
+        mode = self.config.get("dedupe_mode", "off")
+        if dedupe and mode in ("skip", "link"):
+            original = self.find_duplicate(phash, exclude=path)
+            if original and mode == "skip":
+                return original
+            if original:
                 try:
-                    history = json.load(f)
-                except json.JSONDecodeError:
-                    history = []
-        
-        entry = {
-            "path": file_path,
-            "timestamp": datetime.now().isoformat(),
-            "filename": os.path.basename(file_path)
-        }
-        history.append(entry)
-        
-        with open(self.history_path, "w") as f:
-            json.dump(history, f, indent=4)
+                    os.link(original, path)
+                    self.add_to_history(path, dict(metadata or {}, duplicate_of=original), to_signed(phash))
+                    return path
+                except OSError:
+                    pass # Hard links unsupported here; write a copy
+        write_atomic(path, self.encode(image))
+        self.add_to_history(path, metadata, to_signed(phash))
+        return path
 
-    def get_history(self):
-        if os.path.exists(self.history_path):
-            with open(self.history_path, "r") as f:
-                return json.load(f)
-        return []
+    def find_duplicate(self, phash, exclude=None):
+        """The closest file saved in the last dedupe_window_minutes within dedupe_distance bits of phash, or None."""
+        distance = int(self.config.get("dedupe_distance", 4))
+        if self._duplicates is None or self._duplicates.index.radius < distance:
+            self._duplicates = DuplicateFinder(self.history, max(4, distance))
+        since = datetime.now() - timedelta(minutes=float(self.config.get("dedupe_window_minutes", 60)))
+        return self._duplicates.find(phash, distance, since, exclude)
+
+    def save_async(self, image, path=None, metadata=None):
+        """
+        Like save_screenshot, but encodes and writes on a worker thread.
+        Returns a SaveHandle at once: handle.path is the destination and
+        handle.result() waits for the write (and is the earlier file's path
+        if dedupe_mode "skip" dropped it). Don't draw on the image after
+        handing it over.
+        """
+        if self._saver is None:
+            self._saver = SaveQueue(self._write_screenshot, int(self.config.get("save_workers", 2)))
+            atexit.register(self.close)
+        dedupe = path is None
+        if path is None:
+            path = self.get_save_path()
+        return self._saver.submit(image, path, metadata, dedupe=dedupe)
+
+    def flush(self):
+        """Waits for every background save to reach the disk."""
+        if self._saver:
+            self._saver.flush()
+
+    def close(self):
+        if self._saver:
+            self._saver.close()
+            self._saver = None
+        if self._thumbnails:
+            self._thumbnails.close()
+            self._thumbnails = None
+
+    def add_to_history(self, file_path, metadata=None, phash=None):
+        """Indexes a file written outside save_screenshot(), e.g. a recording or timelapse frame; returns the entry id."""
+        return self.history.add(file_path, metadata, phash=phash)
+
+    def get_history(self, **filters):
+        """History entries, oldest first. Takes HistoryStore.query filters and paging."""
+        return self.history.query(**filters)
+
+    @property
+    def thumbnails(self):
+        """ThumbnailService for history entries, cached under base_dir/thumbs."""
+        if self._thumbnails is None:
+            self._thumbnails = ThumbnailService(os.path.join(self.base_dir, "thumbs"), self.config.get("thumb_size", (192, 128)),
+                                                int(self.config.get("thumb_workers", 2)), self.config.get("thumb_memory_mb", 64),
+                                                self.config.get("thumb_disk_mb", 256))
+        return self._thumbnails
@@ -1,39 +1,583 @@
-import mss
 import time
 import threading
 import os
+import struct
+import json
+import queue
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from collections import deque
 from datetime import datetime
-from PIL import Image
+from PIL import Image, ImageChops, GifImagePlugin
+from core.spool import FrameSpool, frame_durations, evenly
+from core.replay import ReplayBuffer
+from core.backends import MssBackend
+from core.capture import CaptureManager
+from utils.frame_ops import to_pil, box_factor
+from utils.redaction import Redactor
+
+class PipeEncoder:
+    """
+    Base for MP4 encoders fed raw BGRA frames from the capture thread.
+    Frames are queued and written by a background thread, so a grab only
+    waits on the encoder when the queue is full.
+    """
+    def __init__(self, output_path, size, fps, max_queue=32):
+        self.output_path = output_path
+        self.size = size
+        self.fps = fps
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.max_depth = 0
+        self.ticks = 0 # Output frames queued so far, at self.fps
+        self.frames_written = 0
+        self.error = None
+        self.thread = None
+
+    @property
+    def queue_depth(self):
+        """Frames waiting to be written to the encoder."""
+        return self.queue.qsize()
+
+    def start(self):
+        self._open()
+        self.thread = threading.Thread(target=self._write_loop, daemon=True)
+        self.thread.start()
+        return self
+
+    def write(self, bgra, repeat=1):
+        self.queue.put((bgra, repeat))
+        self.ticks += repeat
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    def write_until(self, bgra, end):
+        """
+        Writes a frame that stays on screen until `end` seconds into the
+        recording. Repeats are counted against the absolute timeline, so
+        rounding never accumulates into drift.
+        """
+        target = max(self.ticks + 1, round(end * self.fps))
+        self.write(bgra, target - self.ticks)
+
+    def close(self):
+        """Flushes pending frames and finalizes the file. Returns the output path."""
+        self.queue.put(None)
+        if self.thread:
+            self.thread.join()
+        self._finish()
+        if self.error:
+            raise self.error
+        return self.output_path
+
+    def _write_loop(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            if self.error:
+                continue # Keep draining so the capture thread never blocks
+            bgra, repeat = item
+            try:
+                for _ in range(repeat):
+                    self._write_frame(bgra)
+                self.frames_written += 1
+            except Exception as e:
+                self.error = e
+
+    def _open(self): pass
+    def _write_frame(self, bgra): raise NotImplementedError
+    def _finish(self): pass
+
+class FFmpegPipeEncoder(PipeEncoder):
+    """
+    Streams frames into a long-lived ffmpeg process as rawvideo bgra over stdin.
+    With vfr=True, the repeats written for held frames are dropped again by
+    mpdecimate, so the MP4 gets one frame per change with its real duration.
+    """
+    def __init__(self, output_path, size, fps, max_queue=32, max_width=1920, crf=23, vfr=True):
+        super().__init__(output_path, size, fps, max_queue)
+        self.max_width = max_width
+        self.crf = crf
+        self.vfr = vfr
+        self.proc = None
+
+    def build_command(self):
+        w, h = self.size
+        # Cap the width like the old PIL thumbnail did; x264 needs even dimensions
+        filters = f"scale='trunc(min({self.max_width},iw)/2)*2':-2"
+        timing = []
+        if self.vfr:
+            # Only drop exact repeats, then keep their timestamps
+            filters = "mpdecimate=hi=1:lo=1:frac=0:max=0," + filters
+            timing = ['-fps_mode', 'vfr']
+        return [
+            'ffmpeg', '-y', '-nostats', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgra',
+            '-s', f'{w}x{h}', '-framerate', str(self.fps),
+            '-i', '-',
+            '-vf', filters, *timing,
+            '-c:v', 'libx264', '-preset', 'veryfast',
+            '-pix_fmt', 'yuv420p', '-crf', str(self.crf),
+            self.output_path
+        ]
+
+    def _open(self):
+        # stderr goes to a file: a full stderr pipe would stall ffmpeg mid-recording
+        self.log = tempfile.TemporaryFile()
+        self.proc = subprocess.Popen(self.build_command(), stdin=subprocess.PIPE,
+                                     stdout=subprocess.DEVNULL, stderr=self.log)
+
+    def _write_frame(self, bgra):
+        self.proc.stdin.write(bgra)
+
+    def _finish(self):
+        try: self.proc.stdin.close()
+        except OSError: pass
+        code = self.proc.wait()
+        self.log.seek(0)
+        err = self.log.read().decode(errors="replace").strip()
+        self.log.close()
+        if code != 0 and not self.error:
+            self.error = RuntimeError(f"ffmpeg exited with {code}: {err}")
+
+class RawVideoEncoder(PipeEncoder):
+    """
+    Stand-in for ffmpeg in tests and on machines without it. Writes the
+    exact rawvideo bgra stream ffmpeg would have received to a .bgra file.
+    """
+    def __init__(self, output_path, size, fps, max_queue=32):
+        super().__init__(os.path.splitext(output_path)[0] + ".bgra", size, fps, max_queue)
+        self.file = None
+
+    def _open(self):
+        self.file = open(self.output_path, "wb")
+
+    def _write_frame(self, bgra):
+        self.file.write(bgra)
+
+    def _finish(self):
+        self.file.close()
+
+class ChangeDetector:
+    """
+    Flags grabs identical to the previous distinct one. bytes equality is a
+    memcmp that stops at the first differing byte, so changed frames cost
+    almost nothing and a static 4K frame costs one linear scan.
+    """
+    def __init__(self):
+        self.prev = None
+        self.skipped = 0
+
+    def is_duplicate(self, bgra):
+        if self.prev is not None and bgra == self.prev:
+            self.skipped += 1
+            return True
+        self.prev = bgra
+        return False
+
+FPS_CHOICES = (5, 10, 30, 60)
+
+GRAB_SAMPLES = 4096 # Recent grab times kept for percentiles, about 7 minutes at 10 fps
+
+class RecordingStats:
+    """
+    Per-recording timing counters, saved as <output>.stats.json. Grab time
+    percentiles cover the last GRAB_SAMPLES grabs; the max covers them all.
+    """
+    def __init__(self, target_fps):
+        self.target_fps = target_fps
+        self.fps = target_fps
+        self.frames = 0
+        self.dropped = 0
+        self.grab_times = deque(maxlen=GRAB_SAMPLES)
+        self.grab_max = 0.0
+        self.fps_changes = [] # (seconds into recording, new fps)
+        self.started = None
+        self.ended = None
+        self.paused = 0.0 # Seconds spent paused, excluded from achieved fps
+        self.extra = {}
+
+    def percentile(self, p):
+        if not self.grab_times:
+            return 0.0
+        ordered = sorted(self.grab_times)
+        return ordered[min(len(ordered) - 1, int(p / 100.0 * len(ordered)))]
+
+    @property
+    def achieved_fps(self):
+        elapsed = (self.ended or time.monotonic()) - self.started - self.paused if self.started else 0
+        return self.frames / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self):
+        return {
+            "target_fps": self.target_fps,
+            "final_fps": self.fps,
+            "achieved_fps": round(self.achieved_fps, 2),
+            "frames": self.frames,
+            "dropped_frames": self.dropped,
+            "grab_ms": {f"p{p}": round(self.percentile(p) * 1000, 2) for p in (50, 90, 99)},
+            "grab_ms_max": round(self.grab_max * 1000, 2),
+            "fps_changes": self.fps_changes,
+            "paused_seconds": round(self.paused, 2),
+            **self.extra
+        }
+
+    def save(self, output_path):
+        path = os.path.splitext(output_path)[0] + ".stats.json"
+        with open(path, "w") as f:
+            json.dump(self.as_dict(), f, indent=4)
+        return path
+
+class FrameScheduler:
+    """
+    Paces grabs on absolute deadlines from the monotonic clock, so a slow
+    grab doesn't push back the whole timeline. Deadlines that pass while a
+    grab is running count as dropped frames. With adaptive=True, once
+    grabs have kept overrunning the budget for OVERRUN_SECONDS, the rate
+    drops straight to the fastest of FPS_CHOICES whose interval is longer
+    than the p90 of those grabs.
+    """
+    OVERRUN_SECONDS = 1.0
+
+    def __init__(self, fps, stats, adaptive=True):
+        self.stats = stats
+        self.adaptive = adaptive
+        self.overrun_since = None # When the current run of overrunning grabs began
+        self.overruns = [] # Grab times in that run
+        self._set_fps(fps, time.monotonic())
+
+    def _set_fps(self, fps, now):
+        self.fps = fps
+        self.interval = 1.0 / fps
+        self.next_deadline = now
+        self.stats.fps = fps
+
+    def reset(self):
+        """Restarts the deadline grid from now, e.g. after a pause."""
+        self.next_deadline = time.monotonic()
+        self.overrun_since, self.overruns = None, []
+
+    def wait(self):
+        """Sleeps until the next deadline and returns it."""
+        delay = self.next_deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        return self.next_deadline
+
+    def frame_done(self, grab_time):
+        now = time.monotonic()
+        self.stats.frames += 1
+        self.stats.grab_times.append(grab_time)
+        self.stats.grab_max = max(self.stats.grab_max, grab_time)
+        self.next_deadline += self.interval
+        if now > self.next_deadline:
+            missed = int((now - self.next_deadline) / self.interval) + 1
+            self.stats.dropped += missed
+            self.next_deadline += missed * self.interval
+
+        if grab_time <= self.interval:
+            self.overrun_since, self.overruns = None, []
+            return
+        if self.overrun_since is None:
+            self.overrun_since = now - grab_time
+        self.overruns.append(grab_time)
+        if self.adaptive and now - self.overrun_since >= self.OVERRUN_SECONDS:
+            p90 = sorted(self.overruns)[int(0.9 * (len(self.overruns) - 1))]
+            fits = [f for f in FPS_CHOICES if 1.0 / f > p90]
+            fps = fits[-1] if fits else FPS_CHOICES[0]
+            if fps < self.fps:
+                self._set_fps(fps, now)
+                self.stats.fps_changes.append((round(now - self.stats.started, 2), self.fps))
+            self.overrun_since, self.overruns = None, []
+
+def _convert_chunk(chunk, max_size):
+    images = []
+    for bgra, size in chunk:
+        # Exact 2x/4x box downscale first (e.g. 4K -> 1080p), LANCZOS only for what's left
+        img = to_pil(bgra, size, factor=box_factor(size[0], max_size[0]))
+        if img.width > max_size[0]:
+            img.thumbnail(max_size, Image.Resampling.LANCZOS)
+        images.append(img)
+    return images
+
+def convert_frames(frames, max_size=(1920, 1080), workers=0, chunk_size=4):
+    """
+    Yields (bgra, size) pairs as RGB images, downscaled to fit max_size, in
+    input order. Conversion runs across a thread pool: Pillow releases the
+    GIL while unpacking and resampling, and threads read the spool's
+    bytes/mmap views in place, so nothing is pickled or copied to hand
+    frames to workers. At most 2 * workers chunks are in flight: a new
+    one is submitted as each finished chunk is yielded, so workers never
+    wait on a window boundary and memory stays bounded.
+    """
+    workers = workers or os.cpu_count() or 1
+    frames = iter(frames)
+    if workers == 1:
+        for frame in frames:
+            yield from _convert_chunk([frame], max_size)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        while True:
+            while len(in_flight) < 2 * workers:
+                chunk = list(islice(frames, chunk_size))
+                if not chunk:
+                    break
+                in_flight.append(pool.submit(_convert_chunk, chunk, max_size))
+            if not in_flight:
+                return
+            yield from in_flight.popleft().result()
+
+class GifWriter:
+    """
+    Delta-frame GIF encoder. One global palette is built from sampled
+    frames, and each frame is cropped to the box that changed since the
+    previous one. Pixels in that box that did not change are written as the
+    transparent index, and disposal 1 keeps the rest of the canvas. Frames
+    with no change only extend the previous frame's delay.
+    """
+    TRANSPARENT = 255
+    PALETTE_SAMPLES = 16
+
+    def __init__(self, output_path, size, loop=0, palette_samples=PALETTE_SAMPLES):
+        self.output_path = output_path
+        self.size = size
+        self.loop = loop
+        self.palette_samples = palette_samples
+        self.palette = None
+        self.canvas = None # Quantized frame currently shown
+        self.prev_rgb = None
+        self.pending = None # (sub-image, offset, duration) awaiting its final delay
+        self.file = None
+
+    def build_palette(self, frames):
+        """Quantizes a montage of evenly sampled frames to 255 colors (index 255 stays transparent)."""
+        samples = evenly(frames, self.palette_samples)
+        tile_w = min(320, self.size[0])
+        tile_h = max(1, self.size[1] * tile_w // self.size[0])
+        montage = Image.new("RGB", (tile_w, tile_h * len(samples)))
+        for i, frame in enumerate(samples):
+            montage.paste(frame.resize((tile_w, tile_h), Image.Resampling.NEAREST), (0, i * tile_h))
+        self.palette = montage.quantize(255, method=Image.Quantize.MEDIANCUT)
+
+    def _write_header(self):
+        w, h = self.size
+        colors = self.palette.getpalette()[:765]
+        colors += [0] * (768 - len(colors))
+        self.file.write(b"GIF89a" + struct.pack("<HHBBB", w, h, 0xF7, 0, 0) + bytes(colors))
+        self.file.write(b"!\xff\x0bNETSCAPE2.0\x03\x01" + struct.pack("<H", self.loop) + b"\x00")
+
+    def add(self, frame, duration):
+        if self.file is None:
+            if self.palette is None:
+                self.build_palette([frame])
+            self.file = open(self.output_path, "wb")
+            self._write_header()
+
+        if self.prev_rgb is None:
+            bbox = (0, 0) + self.size
+        else:
+            bbox = ImageChops.difference(frame, self.prev_rgb).getbbox()
+        self.prev_rgb = frame
+        if bbox is None:
+            if self.pending:
+                sub, offset, prev_duration = self.pending
+                self.pending = (sub, offset, prev_duration + duration)
+            return
+
+        sub = frame.crop(bbox).quantize(palette=self.palette, dither=Image.Dither.NONE)
+        if self.canvas is None:
+            self.canvas = sub.copy()
+        else:
+            # Unchanged palette indices inside the box become transparent
+            shown = self.canvas.crop(bbox)
+            same = ImageChops.difference(Image.frombytes("L", sub.size, sub.tobytes()),
+                                         Image.frombytes("L", sub.size, shown.tobytes()))
+            self.canvas.paste(sub, bbox[:2])
+            sub.paste(self.TRANSPARENT, mask=same.point(lambda v: 255 if v == 0 else 0))
+        self._flush()
+        self.pending = (sub, bbox[:2], duration)
+
+    def _flush(self):
+        if self.pending:
+            sub, offset, duration = self.pending
+            for chunk in GifImagePlugin.getdata(sub, offset=offset, duration=duration,
+                                                disposal=1, transparency=self.TRANSPARENT):
+                self.file.write(chunk)
+            self.pending = None
+
+    def close(self):
+        if self.file:
+            self._flush()
+            self.file.write(b";")
+            self.file.close()
+        return self.output_path
+
+def write_gif(output_path, frames, durations, loop=0, samples=None):
+    """
+    Writes RGB frames with per-frame durations (ms) through GifWriter. The
+    palette comes from `samples` (RGB images) when given, so `frames` can
+    be a generator that is encoded one frame at a time; otherwise frames
+    must be a list and is sampled itself.
+    """
+    samples = frames if samples is None else samples
+    if not samples:
+        return None
+    writer = GifWriter(output_path, samples[0].size, loop)
+    writer.build_palette(samples)
+    for frame, duration in zip(frames, durations):
+        writer.add(frame, duration)
+    return writer.close()
+
+class SegmentedEncoder:
+    """
+    Splits an MP4 recording into standalone parts of `segment_seconds`
+    (record_<time>.part000.mp4, ...). Each part is closed and flushed on a
+    background thread as soon as the timeline passes its end, so at most
+    one part is lost in a crash. close() joins the parts with a
+    stream-copy concat. Exposes the same interface as PipeEncoder.
+    """
+    def __init__(self, encoder_factory, output_path, size, fps, segment_seconds):
+        self.encoder_factory = encoder_factory
+        self.output_path = output_path
+        self.size = size
+        self.fps = fps
+        self.segment_seconds = segment_seconds
+        self.current = None
+        self.parts = []
+        self.closing = []
+        self.ticks = 0 # Output frames written so far, at self.fps, across all parts
+        self.seg_ticks = max(1, round(segment_seconds * fps))
+        self.seg_end = self.seg_ticks # Tick at which the current part ends
+        self.max_depth = 0
+
+    @property
+    def queue_depth(self):
+        return self.current.queue_depth if self.current else 0
+
+    def start(self):
+        base, ext = os.path.splitext(self.output_path)
+        part_path = f"{base}.part{len(self.parts):03d}{ext}"
+        self.current = self.encoder_factory(part_path, self.size, self.fps).start()
+        self.parts.append(self.current)
+        return self
+
+    def write_until(self, bgra, end):
+        # Ticks are counted on the whole recording's timeline, as in PipeEncoder,
+        # and a frame held across a boundary splits its repeats between both parts
+        target = max(self.ticks + 1, round(end * self.fps))
+        while target > self.seg_end:
+            if self.seg_end > self.ticks:
+                self.current.write(bgra, self.seg_end - self.ticks)
+                self.ticks = self.seg_end
+            self.max_depth = max(self.max_depth, self.current.max_depth)
+            self.seg_end += self.seg_ticks
+            self._rotate()
+        self.current.write(bgra, target - self.ticks)
+        self.ticks = target
+        self.max_depth = max(self.max_depth, self.current.max_depth)
+
+    def _rotate(self):
+        finished = self.current
+        thread = threading.Thread(target=self._close_part, args=(finished,), daemon=True)
+        thread.start()
+        self.closing.append(thread)
+        self.start()
+
+    def _close_part(self, encoder):
+        try: encoder.close()
+        except Exception as e: print(f"Segment Error: {e}")
+
+    def close(self):
+        self._close_part(self.current)
+        for thread in self.closing:
+            thread.join()
+        done = [p.output_path for p in self.parts if not p.error and os.path.exists(p.output_path)]
+        if not done:
+            raise RuntimeError("No segment was encoded")
+        return concat_segments(done, self.output_path)
+
+def concat_segments(parts, output_path):
+    """Joins finished parts without re-encoding and removes them. Returns the output path."""
+    if parts[0].endswith(".bgra"):
+        # RawVideoEncoder parts: rawvideo concatenates byte for byte
+        output_path = os.path.splitext(output_path)[0] + ".bgra"
+        with open(output_path, "wb") as out:
+            for part in parts:
+                with open(part, "rb") as f:
+                    shutil.copyfileobj(f, out)
+    else:
+        list_path = os.path.splitext(output_path)[0] + ".parts.txt"
+        with open(list_path, "w") as f:
+            for part in parts:
+                f.write("file '%s'\n" % os.path.abspath(part).replace("'", "'\\''"))
+        cmd = ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0', '-i', list_path, '-c', 'copy', output_path]
+        subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        os.remove(list_path)
+    for part in parts:
+        os.remove(part)
+    return output_path
+
+def make_mp4_encoder(output_path, size, fps):
+    if shutil.which("ffmpeg"):
+        return FFmpegPipeEncoder(output_path, size, fps)
+    print("FFmpeg not found, writing raw BGRA stream instead")
+    return RawVideoEncoder(output_path, size, fps)
 
 class ScreenRecorder:
-    def __init__(self, file_manager):
+    def __init__(self, file_manager, encoder_factory=make_mp4_encoder, backend_factory=MssBackend, capture_manager=None):
         self.file_manager = file_manager
+        self.encoder_factory = encoder_factory
+        self.backend_factory = backend_factory
+        # Monitor lookups reuse the caller's handle; capture threads open their own
+        self.capture_manager = capture_manager or CaptureManager(backend_factory)
+        self.encoder = None
+        self.detector = None
+        self.stats = None
         self.is_recording = False
+        self.is_paused = False
         self.is_saving = False
         self.thread = None
         self.output_path = ""
         self.on_save_complete = None
+        self.replay = None
+        self.replay_stats = None
+        self.is_replaying = False
+
+    @property
+    def encoder_queue_depth(self):
+        """Frames captured but not yet written to the MP4 encoder."""
+        return self.encoder.queue_depth if self.encoder else 0
+
+    @property
+    def frames_skipped(self):
+        """Grabs collapsed into the previous frame's duration because nothing changed."""
+        return self.detector.skipped if self.detector else 0
 
     def start_recording(self, monitor_index=1, region=None):
         if self.is_recording or self.is_saving:
             return None
         
         self.is_recording = True
+        self.is_paused = False
         self.output_path = self._get_record_path()
-        
-        if region:
-            monitor = {"top": region[1], "left": region[0], "width": region[2], "height": region[3]}
-        else:
-            with mss.mss() as sct:
-                if monitor_index >= len(sct.monitors):
-                    monitor_index = 0
-                monitor = sct.monitors[monitor_index]
+        monitor = self._resolve_monitor(monitor_index, region)
             
         self.thread = threading.Thread(target=self._record_loop, args=(monitor,), daemon=True)
         self.thread.start()
         return self.output_path
 
-    def _get_record_path(self):
+    def _resolve_monitor(self, monitor_index, region):
+        if region:
+            return {"top": region[1], "left": region[0], "width": region[2], "height": region[3]}
+        monitors = self.capture_manager.get_monitors()
+        if monitor_index >= len(monitors):
+            monitor_index = 0
+        return monitors[monitor_index]
+
+    def _get_record_path(self, prefix="record"):
         today = datetime.now().strftime("%Y-%m-%d")
         day_dir = os.path.join(self.file_manager.config["save_dir"], today)
         if not os.path.exists(day_dir):
@@ -41,86 +585,224 @@ class ScreenRecorder:
         
         timestamp = datetime.now().strftime("%H-%M-%S")
         fmt = self.file_manager.config.get("rec_format", "gif").lower()
-        return os.path.join(day_dir, f"record_{timestamp}.{fmt}")
+        return os.path.join(day_dir, f"{prefix}_{timestamp}.{fmt}")
+
+    def _make_redactor(self, size):
+        """Redactor for config "rec_redact_boxes" (in recorded-area pixels), or None."""
+        cfg = self.file_manager.config
+        boxes = cfg.get("rec_redact_boxes") or []
+        if not boxes:
+            return None
+        return Redactor(boxes, size, cfg.get("rec_redact_mode", "pixelate"),
+                        int(cfg.get("redact_radius", 10)), int(cfg.get("redact_block", 12)))
+
+    def _is_mp4(self):
+        return self.output_path.lower().endswith(".mp4")
+
+    def _make_encoder(self, output_path, size, fps):
+        segment = float(self.file_manager.config.get("rec_segment_seconds", 0))
+        if segment > 0:
+            return SegmentedEncoder(self.encoder_factory, output_path, size, fps, segment).start()
+        return self.encoder_factory(output_path, size, fps).start()
 
     def _record_loop(self, monitor):
-        fps = 10.0
+        fps = int(self.file_manager.config.get("rec_fps", 10))
+        if fps not in FPS_CHOICES:
+            fps = 10
         frame_delay = 1.0 / fps
-        raw_frames = []
+        self.stats = RecordingStats(fps)
+        scheduler = FrameScheduler(fps, self.stats, self.file_manager.config.get("rec_adaptive_fps", True))
+        budget = int(self.file_manager.config.get("rec_ram_budget_mb", 512)) * 1024 * 1024
+        spool = FrameSpool(os.path.splitext(self.output_path)[0] + ".spool", budget)
+        self.detector = ChangeDetector() if self.file_manager.config.get("rec_dedupe", True) else None
+        redactor = self._make_redactor((monitor["width"], monitor["height"]))
+        pending = None # Streamed frame waiting for its duration
         
-        with mss.mss() as sct:
+        # Streaming MP4: frames go straight to ffmpeg while capturing
+        self.encoder = None
+        if self._is_mp4() and self.file_manager.config.get("rec_stream", True):
+            try:
+                self.encoder = self._make_encoder(self.output_path, (monitor["width"], monitor["height"]), fps)
+            except Exception as e:
+                print(f"Encoder Error: {e}")
+        
+        rec_start = self.stats.started = time.monotonic()
+        with self.backend_factory() as sct:
             while self.is_recording:
-                start_time = time.time()
+                if self.is_paused:
+                    # Paused time is cut out of the timeline
+                    paused_at = time.monotonic()
+                    while self.is_paused and self.is_recording:
+                        time.sleep(0.05)
+                    self.stats.paused += time.monotonic() - paused_at
+                    scheduler.reset()
+                    continue
+                scheduler.wait()
+                if not self.is_recording:
+                    break
+                start_time = time.monotonic()
+                timeline = start_time - self.stats.paused
                 try:
                     sct_img = sct.grab(monitor)
-                    raw_frames.append((sct_img.bgra, sct_img.size))
-                    if len(raw_frames) >= 600: # Increased to 1 min @ 10fps
-                        self.is_recording = False
-                        break
+                    if redactor:
+                        redactor.apply_buffer(sct_img.raw) # In place, before anything copies the frame
+                    bgra = sct_img.bgra
+                    if self.detector and self.detector.is_duplicate(bgra):
+                        pass # Previous frame just lasts longer
+                    elif self.encoder:
+                        if pending:
+                            self.encoder.write_until(pending, timeline - rec_start)
+                        pending = bgra
+                    else:
+                        spool.append(bgra, sct_img.size, timeline)
                 except Exception as e:
                     print(f"Capture Error: {e}")
                     break
-                
-                elapsed = time.time() - start_time
-                if elapsed < frame_delay:
-                    time.sleep(frame_delay - elapsed)
+                scheduler.frame_done(time.monotonic() - start_time)
+        self.stats.ended = time.monotonic()
+        spool.end_time = self.stats.ended - self.stats.paused
+        if pending:
+            self.encoder.write_until(pending, spool.end_time - rec_start)
         
-        if raw_frames:
+        if self.encoder:
+            self.is_saving = True
+            threading.Thread(target=self._finish_stream, daemon=True).start()
+        elif len(spool):
             self.is_saving = True
-            save_thread = threading.Thread(target=self._process_and_save, args=(raw_frames, frame_delay), daemon=True)
+            save_thread = threading.Thread(target=self._process_and_save, args=(spool, frame_delay), daemon=True)
             save_thread.start()
         else:
+            spool.close()
             self.is_saving = False
 
-    def _process_and_save(self, raw_frames, frame_delay):
-        import subprocess
+    def _finish_stream(self):
         try:
-            processed_frames = []
-            for bgra, size in raw_frames:
-                img = Image.frombytes("RGB", size, bgra, "raw", "BGRX")
-                if img.width > 1920: # Higher res for MP4
-                    img.thumbnail((1920, 1080), Image.Resampling.LANCZOS)
-                processed_frames.append(img)
-
-            if not processed_frames: return
-
-            if self.output_path.lower().endswith(".gif"):
-                processed_frames[0].save(
-                    self.output_path,
-                    save_all=True,
-                    append_images=processed_frames[1:],
-                    optimize=True,
-                    duration=int(frame_delay * 1000),
-                    loop=0
-                )
-            else:
-                # MP4 via FFmpeg
-                import tempfile
-                with tempfile.TemporaryDirectory() as tmpdir:
-                    # Save frames as temporary PNGs
-                    for i, frame in enumerate(processed_frames):
-                        frame.save(os.path.join(tmpdir, f"f_{i:04d}.png"))
-                    
-                    # Call FFmpeg
-                    cmd = [
-                        'ffmpeg', '-y',
-                        '-framerate', str(1.0/frame_delay),
-                        '-i', os.path.join(tmpdir, 'f_%04d.png'),
-                        '-c:v', 'libx264',
-                        '-pix_fmt', 'yuv420p',
-                        '-crf', '23',
-                        self.output_path
-                    ]
-                    subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+            self.output_path = self.encoder.close()
+            self._save_stats()
+            self.file_manager.add_to_history(self.output_path)
+        except Exception as e:
+            print(f"Encode Error: {e}")
+        finally:
+            self.is_saving = False
+            if self.on_save_complete:
+                self.on_save_complete(self.output_path)
+
+    def _encode_frames(self, output_path, frames, durations, fps, samples=()):
+        """
+        Encodes (bgra, size, timestamp) frames, each shown for the matching
+        duration in seconds, to GIF or MP4, streaming them one at a time.
+        A GIF's palette is built from `samples`, a few frames in the same
+        form. Returns the written path.
+        """
+        if output_path.lower().endswith(".mp4"):
+            # Same rawvideo pipe as streaming, fed after capture ends
+            encoder = None
+            for (bgra, size, timestamp), duration in zip(frames, durations):
+                if encoder is None:
+                    start = timestamp
+                    encoder = self._make_encoder(output_path, size, fps)
+                encoder.write_until(bgra, timestamp + duration - start)
+            return encoder.close()
+
+        workers = int(self.file_manager.config.get("rec_workers", 0))
+        images = convert_frames(((bgra, size) for bgra, size, _ in frames), workers=workers)
+        palette = list(convert_frames(((bgra, size) for bgra, size, _ in samples), workers=workers))
+        return write_gif(output_path, images, [max(20, int(d * 1000)) for d in durations], samples=palette)
+
+    def _process_and_save(self, spool, frame_delay):
+        saved = False
+        try:
+            self.output_path = self._encode_frames(self.output_path, spool.frames(), spool.durations(), 1.0 / frame_delay,
+                                                   spool.sample(GifWriter.PALETTE_SAMPLES))
+            saved = True
+            self._save_stats()
+            self.file_manager.add_to_history(self.output_path)
 
         except Exception as e:
             print(f"Process/Save Error: {e}")
         finally:
+            # Keep the spool file on failure so it can be recovered
+            spool.close(delete=saved)
             self.is_saving = False
             if self.on_save_complete:
                 self.on_save_complete(self.output_path)
 
+    def _save_stats(self):
+        self.stats.extra["frames_skipped"] = self.frames_skipped
+        if self.encoder:
+            self.stats.extra["encoder_max_queue"] = self.encoder.max_depth
+        self.stats.save(self.output_path)
+
+    def pause_recording(self):
+        if self.is_recording:
+            self.is_paused = True
+
+    def resume_recording(self):
+        self.is_paused = False
+
     def stop_recording(self, callback=None):
-        self.is_recording = False
+        # Set the callback first: a streamed MP4 can finish almost immediately
         self.on_save_complete = callback
+        self.is_recording = False
+        self.is_paused = False
         return self.output_path
+
+    def start_replay(self, monitor_index=1, region=None):
+        """Starts the always-on instant replay buffer (runs alongside normal recording)."""
+        if self.is_replaying:
+            return
+        cfg = self.file_manager.config
+        self.replay = ReplayBuffer(float(cfg.get("replay_seconds", 30)),
+                                   int(cfg.get("replay_budget_mb", 256)) * 1024 * 1024)
+        self.is_replaying = True
+        monitor = self._resolve_monitor(monitor_index, region)
+        threading.Thread(target=self._replay_loop, args=(monitor,), daemon=True).start()
+
+    def stop_replay(self):
+        self.is_replaying = False
+
+    def _replay_loop(self, monitor):
+        fps = int(self.file_manager.config.get("replay_fps", 10))
+        self.replay_stats = RecordingStats(fps if fps in FPS_CHOICES else 10)
+        scheduler = FrameScheduler(self.replay_stats.fps, self.replay_stats)
+        detector = ChangeDetector()
+        redactor = self._make_redactor((monitor["width"], monitor["height"]))
+        self.replay_stats.started = time.monotonic()
+        with self.backend_factory() as sct:
+            while self.is_replaying:
+                scheduler.wait()
+                start_time = time.monotonic()
+                try:
+                    sct_img = sct.grab(monitor)
+                    if redactor:
+                        redactor.apply_buffer(sct_img.raw)
+                    bgra = sct_img.bgra
+                    if not detector.is_duplicate(bgra):
+                        self.replay.push(bgra, sct_img.size, start_time)
+                except Exception as e:
+                    print(f"Replay Capture Error: {e}")
+                    break
+                scheduler.frame_done(time.monotonic() - start_time)
+        self.is_replaying = False
+        self.replay.close()
+
+    def save_replay(self, callback=None):
+        """Writes the buffered window to replay_<time>.gif/mp4 in the background."""
+        if not self.replay or not len(self.replay):
+            return None
+        entries = self.replay.snapshot()
+        durations = frame_durations([e[2] for e in entries], time.monotonic())
+        path = self._get_record_path("replay")
+
+        def encode():
+            out = path
+            try:
+                out = self._encode_frames(path, ReplayBuffer.frames(entries), durations, self.replay_stats.fps,
+                                          list(ReplayBuffer.frames(evenly(entries, GifWriter.PALETTE_SAMPLES))))
+                self.file_manager.add_to_history(out)
+            except Exception as e:
+                print(f"Replay Save Error: {e}")
+            if callback:
+                callback(out)
+        threading.Thread(target=encode, daemon=True).start()
+        return path
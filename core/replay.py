@@ -0,0 +1,74 @@
+import zlib
+import queue
+import threading
+from collections import deque
+
+class ReplayBuffer:
+    """
+    Ring buffer of the last `seconds` of recorded frames, for instant replay.
+    push() stores the raw frame and returns at once; a worker thread
+    zlib-compresses it (level 1) shortly after, so the capture thread never
+    waits on compression. The caller is expected to skip duplicates, so a
+    static screen costs almost nothing. Memory is capped at `budget`
+    bytes, counting frames not yet compressed at their raw size; eviction
+    pops from the left of a deque, O(1) per frame.
+    """
+    def __init__(self, seconds=30, budget=256 * 1024 * 1024, level=1):
+        self.seconds = seconds
+        self.budget = budget
+        self.level = level
+        self.entries = deque() # [payload, size, timestamp, compressed]
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.queue = queue.Queue() # Entries waiting for the worker
+        self.worker = threading.Thread(target=self._compress_loop, daemon=True)
+        self.worker.start()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def push(self, bgra, size, timestamp):
+        entry = [bgra, size, timestamp, False]
+        with self.lock:
+            self.entries.append(entry)
+            self.bytes += len(bgra)
+            # Keep the frame that is on screen at the window start
+            while len(self.entries) > 1 and self.entries[1][2] <= timestamp - self.seconds:
+                self._evict()
+            while self.entries and self.bytes > self.budget:
+                self._evict()
+        self.queue.put(entry)
+
+    def _evict(self):
+        entry = self.entries.popleft()
+        self.bytes -= len(entry[0])
+        entry[0] = None # Tells the worker to skip it
+
+    def _compress_loop(self):
+        while True:
+            entry = self.queue.get()
+            if entry is None:
+                return
+            raw = entry[0]
+            if raw is None:
+                continue
+            payload = zlib.compress(raw, self.level)
+            with self.lock:
+                if entry[0] is raw: # Not evicted meanwhile
+                    entry[0], entry[3] = payload, True
+                    self.bytes -= len(raw) - len(payload)
+
+    def close(self):
+        """Stops the worker; frames still waiting stay uncompressed."""
+        self.queue.put(None)
+
+    def snapshot(self):
+        """Returns the current window as a list of (payload, size, timestamp, compressed); capture keeps running."""
+        with self.lock:
+            return [tuple(e) for e in self.entries]
+
+    @staticmethod
+    def frames(entries):
+        """Yields (bgra, size, timestamp), decompressing one frame at a time."""
+        for payload, size, timestamp, compressed in entries:
+            yield zlib.decompress(payload) if compressed else payload, size, timestamp
@@ -0,0 +1,236 @@
+import os
+import time
+import threading
+from datetime import datetime, timedelta
+from PIL import Image
+from core import encoders
+from core.save_queue import write_atomic
+
+class RetentionPolicy:
+    """
+    What to keep. Zero disables a rule. Rules apply in this order: delete
+    files older than max_age_days; transcode PNGs older than
+    transcode_after_days to transcode_format, keeping the new file only if
+    it is smaller (files that don't shrink are not retried); then delete the oldest files until at most max_count
+    remain and the total is at most max_bytes.
+    """
+    def __init__(self, max_age_days=0, max_bytes=0, max_count=0, transcode_after_days=0, transcode_format="webp"):
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self.max_count = max_count
+        self.transcode_after_days = transcode_after_days
+        self.transcode_format = transcode_format
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(float(config.get("retention_max_age_days", 0)),
+                   int(float(config.get("retention_max_gb", 0)) * 2 ** 30),
+                   int(config.get("retention_max_count", 0)),
+                   float(config.get("retention_transcode_after_days", 0)),
+                   config.get("retention_transcode_format", "webp"))
+
+    @property
+    def enabled(self):
+        return bool(self.max_age_days or self.max_bytes or self.max_count or self.transcode_after_days)
+
+class RetentionReport:
+    """What one compaction pass reclaimed."""
+    def __init__(self):
+        self.deleted_files = 0
+        self.deleted_bytes = 0
+        self.transcoded_files = 0
+        self.transcoded_bytes = 0 # Saved by transcoding
+        self.pruned = 0 # Index entries whose file was already gone
+        self.errors = 0
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+
+    @property
+    def reclaimed_bytes(self):
+        return self.deleted_bytes + self.transcoded_bytes
+
+    def as_dict(self):
+        return {
+            "deleted_files": self.deleted_files,
+            "deleted_mb": round(self.deleted_bytes / 2 ** 20, 2),
+            "transcoded_files": self.transcoded_files,
+            "transcoded_mb_saved": round(self.transcoded_bytes / 2 ** 20, 2),
+            "reclaimed_mb": round(self.reclaimed_bytes / 2 ** 20, 2),
+            "pruned_entries": self.pruned,
+            "errors": self.errors,
+            "elapsed_s": round(self.elapsed, 2),
+        }
+
+def _lower_thread_priority():
+    """Best effort: idle priority on Windows, nice 19 for this thread on Linux."""
+    try:
+        from ctypes import windll
+        windll.kernel32.SetThreadPriority(windll.kernel32.GetCurrentThread(), -15) # THREAD_PRIORITY_IDLE
+        return
+    except Exception: pass
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+    except Exception: pass
+
+class RetentionDaemon:
+    """
+    Applies a RetentionPolicy to the files in the history index, without
+    walking the save directory. Each pass works in batches of `batch`
+    files and sleeps `pause` seconds between them, on a background thread
+    at idle priority. It only ever touches files under save_dir. Emptied
+    day and timelapse folders are removed.
+    """
+    def __init__(self, file_manager, policy=None, interval=None, batch=50, pause=0.2):
+        self.file_manager = file_manager
+        self.history = file_manager.history
+        self.policy = policy or RetentionPolicy.from_config(file_manager.config)
+        self.interval = interval or float(file_manager.config.get("retention_interval_minutes", 60)) * 60
+        self.batch = batch
+        self.pause = pause
+        self.last_report = None
+        self.on_report = None
+        self.keep_format = set() # Paths that didn't get smaller in transcode_format, or are hard-linked
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    @property
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, on_report=None):
+        """on_report(report) runs on the daemon thread after each pass."""
+        if self.is_running or not self.policy.enabled:
+            return
+        self.on_report = on_report
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _loop(self):
+        _lower_thread_priority()
+        while not self.stop_event.is_set():
+            report = self.run_once()
+            if self.on_report and (report.reclaimed_bytes or report.pruned or report.errors):
+                self.on_report(report)
+            self.stop_event.wait(self.interval)
+
+    def _owned(self, path):
+        roots = {os.path.abspath(self.file_manager.config["save_dir"]), os.path.abspath(self.file_manager.base_dir)}
+        path = os.path.abspath(path)
+        return any(os.path.commonpath([root, path]) == root for root in roots)
+
+    def _delete(self, entry, report):
+        path = entry["path"]
+        if not self._owned(path):
+            return False
+        try:
+            st = os.stat(path)
+            os.remove(path)
+            report.deleted_files += 1
+            report.deleted_bytes += st.st_size if st.st_nlink == 1 else 0 # Other links still hold the data
+            for extra in (os.path.splitext(path)[0] + ".stats.json",):
+                if os.path.exists(extra): os.remove(extra)
+        except FileNotFoundError:
+            report.pruned += 1
+        except OSError as e:
+            print(f"Retention Error: {path}: {e}")
+            report.errors += 1
+            return False
+        self.history.remove_path(path)
+        self._remove_empty_dirs(os.path.dirname(path))
+        return True
+
+    def _remove_empty_dirs(self, folder):
+        # Day folders, and timelapse folders inside them, once nothing is left
+        save_dir = os.path.abspath(self.file_manager.config["save_dir"])
+        while os.path.abspath(folder) != save_dir and self._owned(folder):
+            try:
+                os.rmdir(folder)
+            except OSError:
+                return # Not empty
+            folder = os.path.dirname(folder)
+
+    def _transcode(self, entry, report):
+        path = entry["path"]
+        if path in self.keep_format or not self._owned(path):
+            return False
+        fmt = self.policy.transcode_format
+        new_path = os.path.splitext(path)[0] + "." + encoders.normalize(fmt)[1]
+        if os.path.exists(new_path):
+            return False
+        try:
+            st = os.stat(path)
+            if st.st_nlink > 1:
+                # A dedupe link: removing this name frees nothing, so a new file would only add space
+                self.keep_format.add(path)
+                return False
+            old_size = st.st_size
+            with Image.open(path) as img:
+                data = encoders.encode(img.convert("RGB"), fmt, "balanced", self.file_manager.config.get("quality", 95))
+            if len(data) >= old_size:
+                self.keep_format.add(path) # Don't encode it again on every pass
+                return False
+            write_atomic(new_path, data)
+            self.history.move_path(path, new_path)
+            os.remove(path)
+            report.transcoded_files += 1
+            report.transcoded_bytes += old_size - len(data)
+            return True
+        except FileNotFoundError:
+            self.history.remove_path(path)
+            report.pruned += 1
+            return True
+        except Exception as e:
+            print(f"Retention Error: {path}: {e}")
+            report.errors += 1
+            return False
+
+    def _run_batches(self, handle, until=None, **query):
+        """
+        Feeds index rows (HistoryStore.files(**query)) to handle(entry) in
+        batches, pausing between them, until the rows run out or until()
+        is true. handle returns True when the row is gone from the query,
+        so only rows it left in place move the offset forward.
+        """
+        skipped = 0
+        while not self.stop_event.is_set() and not (until and until()):
+            entries = self.history.files(limit=self.batch, offset=skipped, **query)
+            if not entries:
+                return
+            for entry in entries:
+                if until and until():
+                    return
+                if not handle(entry):
+                    skipped += 1
+            self.stop_event.wait(self.pause) # Stay out of the way of captures
+
+    def run_once(self):
+        """One incremental pass over the index; returns a RetentionReport."""
+        policy, report = self.policy, RetentionReport()
+
+        if policy.max_age_days:
+            cutoff = datetime.now() - timedelta(days=policy.max_age_days)
+            self._run_batches(lambda e: self._delete(e, report), older_than=cutoff)
+
+        if policy.transcode_after_days and encoders.available(policy.transcode_format):
+            cutoff = datetime.now() - timedelta(days=policy.transcode_after_days)
+            self._run_batches(lambda e: self._transcode(e, report), older_than=cutoff, type="png")
+
+        # Count and byte quotas both give up the oldest files first
+        count, total = self.history.totals()
+        def over():
+            return (policy.max_count and count > policy.max_count) or (policy.max_bytes and total > policy.max_bytes)
+        def trim(entry):
+            nonlocal count, total
+            if not self._delete(entry, report):
+                return False
+            count, total = count - 1, total - entry["size"]
+            return True
+        self._run_batches(trim, until=lambda: not over())
+
+        report.elapsed = time.monotonic() - report.started
+        self.last_report = report
+        return report
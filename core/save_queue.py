@@ -0,0 +1,91 @@
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+class SaveHandle(Future):
+    """
+    Future for a background save; `path` is known immediately, result() is
+    the path once written. The writer may settle on another path (e.g. an
+    earlier duplicate), which is what result() then returns.
+    """
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+class SaveQueue:
+    """
+    Encodes and writes screenshots on worker threads so the Tk thread only
+    pays for picking a file name.
+
+    Saves of one path always go to the same worker, so they are written in
+    order. A save submitted while an earlier save of the same path is still
+    waiting replaces that save's content and shares its handle, so only the
+    latest edit is encoded. Files are written to a temporary name and
+    renamed, so a half-written screenshot is never visible.
+    """
+    def __init__(self, write, workers=2):
+        self.write = write # write(image, path, metadata, **options) -> path written, called on a worker
+        self.lock = threading.Lock()
+        self.waiting = {} # path -> [handle, image, metadata, options] not yet started
+        self.outstanding = {} # path -> number of submitted saves not yet finished
+        self.coalesced = 0
+        self.queues = [queue.Queue() for _ in range(max(1, workers))]
+        self.threads = [threading.Thread(target=self._worker, args=(q,), daemon=True) for q in self.queues]
+        for t in self.threads:
+            t.start()
+
+    def is_pending(self, path):
+        with self.lock:
+            return path in self.outstanding
+
+    def submit(self, image, path, metadata=None, **options):
+        with self.lock:
+            job = self.waiting.get(path)
+            if job:
+                job[1], job[2], job[3] = image, metadata, options
+                self.coalesced += 1
+                return job[0]
+            handle = SaveHandle(path)
+            self.waiting[path] = [handle, image, metadata, options]
+            self.outstanding[path] = self.outstanding.get(path, 0) + 1
+        self.queues[hash(path) % len(self.queues)].put(path)
+        return handle
+
+    def _worker(self, q):
+        while True:
+            path = q.get()
+            if path is None:
+                q.task_done()
+                break
+            with self.lock:
+                handle, image, metadata, options = self.waiting.pop(path)
+            try:
+                handle.set_result(self.write(image, path, metadata, **options) or path)
+            except Exception as e:
+                print(f"Save Error: {path}: {e}")
+                handle.set_exception(e)
+            finally:
+                with self.lock:
+                    self.outstanding[path] -= 1
+                    if not self.outstanding[path]:
+                        del self.outstanding[path]
+                q.task_done()
+
+    def flush(self):
+        """Blocks until every save submitted so far is on disk."""
+        for q in self.queues:
+            q.join()
+
+    def close(self):
+        self.flush()
+        for q in self.queues:
+            q.put(None)
+        for t in self.threads:
+            t.join()
+
+def write_atomic(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
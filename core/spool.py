@@ -0,0 +1,148 @@
+import os
+import sys
+import mmap
+import struct
+
+MAGIC = b"LSSPOOL1"
+# timestamp, width, height, payload length
+RECORD = struct.Struct("<dIII")
+
+class FrameSpool:
+    """
+    Holds recorded BGRA frames within a RAM budget. Once the budget is used
+    up, further frames are appended to a spool file on disk, which is
+    memory-mapped for reading so the encoder gets zero-copy views.
+
+    Spool file layout: MAGIC, then repeated [RECORD header][raw BGRA bytes].
+    A crashed recording can be recovered with `python -m core.spool`.
+    """
+    def __init__(self, spool_path, ram_budget=512 * 1024 * 1024):
+        self.spool_path = spool_path
+        self.ram_budget = ram_budget
+        self.ram_bytes = 0
+        self.disk_bytes = 0
+        self.entries = [] # (data or file offset, size, timestamp)
+        self.end_time = None
+        self.file = None
+        self.map = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def spilled(self):
+        return self.file is not None
+
+    @property
+    def start_time(self):
+        return self.entries[0][2] if self.entries else None
+
+    def durations(self):
+        """Seconds each frame stays on screen; duplicates were never appended."""
+        return frame_durations([e[2] for e in self.entries], self.end_time)
+
+    def append(self, bgra, size, timestamp):
+        if not self.spilled and self.ram_bytes + len(bgra) <= self.ram_budget:
+            self.entries.append((bgra, size, timestamp))
+            self.ram_bytes += len(bgra)
+            return
+        if self.file is None:
+            self.file = open(self.spool_path, "wb")
+            self.file.write(MAGIC)
+        offset = self.file.tell() + RECORD.size
+        self.file.write(RECORD.pack(timestamp, size[0], size[1], len(bgra)))
+        self.file.write(bgra)
+        self.file.flush() # Keep the file recoverable if the app dies
+        self.entries.append((offset, size, timestamp))
+        self.disk_bytes += len(bgra)
+
+    def frames(self, entries=None):
+        """Yields (buffer, size, timestamp); spilled frames are views into the mmap."""
+        if self.file and self.map is None:
+            self.file.close()
+            with open(self.spool_path, "rb") as f:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self.map) if self.map is not None else None
+        for data, size, timestamp in self.entries if entries is None else entries:
+            if isinstance(data, int):
+                yield view[data:data + size[0] * size[1] * 4], size, timestamp
+            else:
+                yield data, size, timestamp
+
+    def sample(self, count):
+        """Up to `count` evenly spaced frames, as frames() yields them, e.g. for a GIF palette."""
+        return list(self.frames(evenly(self.entries, count)))
+
+    def close(self, delete=True):
+        self.entries = []
+        if self.map is not None:
+            try: self.map.close()
+            except BufferError: pass # A consumer still holds a view; GC will unmap
+            self.map = None
+        if self.file:
+            self.file.close()
+            if delete and os.path.exists(self.spool_path):
+                os.remove(self.spool_path)
+            self.file = None
+
+def evenly(items, count):
+    """Up to `count` evenly spaced items of a sequence, first included."""
+    step = max(1, len(items) // max(1, count))
+    return items[::step][:count]
+
+def frame_durations(timestamps, end_time=None, default=0.1):
+    durations = [b - a for a, b in zip(timestamps, timestamps[1:])]
+    if timestamps:
+        durations.append(end_time - timestamps[-1] if end_time else default)
+    return durations
+
+def read_spool(path):
+    """Yields (bgra, size, timestamp) from a spool file, stopping at a truncated tail."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not a LightShot spool file: {path}")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            pos, end = len(MAGIC), len(m)
+            while pos + RECORD.size <= end:
+                timestamp, w, h, length = RECORD.unpack_from(m, pos)
+                pos += RECORD.size
+                if pos + length > end:
+                    break
+                yield m[pos:pos + length], (w, h), timestamp
+                pos += length
+
+def recover(spool_path, output_path):
+    """
+    Re-encodes a spool file left behind by a crashed recording, one frame
+    at a time. The spool doesn't store the frame rate, so the shortest gap
+    between frames stands in for it (duplicates were never appended, so
+    every gap is a multiple of the capture interval).
+    """
+    from PIL import Image
+    timestamps = [timestamp for _, _, timestamp in read_spool(spool_path)]
+    if not timestamps:
+        return None
+    durations = frame_durations(timestamps)
+    gaps = [d for d in durations[:-1] if d > 0]
+    fps = max(1.0, min(60.0, round(1.0 / min(gaps)))) if gaps else 10.0
+    if output_path.lower().endswith(".mp4"):
+        from core.recorder import make_mp4_encoder
+        encoder = None
+        for (bgra, size, timestamp), duration in zip(read_spool(spool_path), durations):
+            if encoder is None:
+                encoder = make_mp4_encoder(output_path, size, fps).start()
+            encoder.write_until(bgra, timestamp + duration - timestamps[0])
+        return encoder.close()
+
+    from core.recorder import write_gif
+    def rgb(frames):
+        return (Image.frombytes("RGB", size, bgra, "raw", "BGRX") for bgra, size, _ in frames)
+    picked = set(evenly(range(len(timestamps)), 16))
+    samples = list(rgb(f for i, f in enumerate(read_spool(spool_path)) if i in picked))
+    return write_gif(output_path, rgb(read_spool(spool_path)), [max(20, int(d * 1000)) for d in durations], samples=samples)
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m core.spool <recording.spool> <output.gif|output.mp4>")
+        sys.exit(1)
+    print(recover(sys.argv[1], sys.argv[2]) or "Spool contains no frames")
@@ -0,0 +1,200 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from PIL import Image
+
+class ThumbnailService:
+    """
+    Thumbnails for browsing the history. get() answers from an in-memory
+    LRU of at most memory_mb without blocking. request() fetches the
+    rest on worker threads, either from the disk cache (base_dir/thumbs,
+    keyed by path, mtime and size) or by decoding the file at reduced size.
+
+    Waiting requests are served newest first, so while scrolling the rows
+    now on screen come before the ones that scrolled past, and cancel()
+    drops those entirely. The disk cache is kept within disk_mb, least
+    recently used first: it is trimmed when the service starts and again
+    whenever new thumbnails push the running total past the limit.
+    """
+    def __init__(self, cache_dir, size=(192, 128), workers=2, memory_mb=64, disk_mb=256):
+        self.cache_dir = cache_dir
+        self.size = tuple(size)
+        self.memory_limit = memory_mb * 2 ** 20
+        self.disk_limit = disk_mb * 2 ** 20
+        self.cond = threading.Condition()
+        self.memory = OrderedDict() # path -> (mtime_ns, image), least recently used first
+        self.memory_bytes = 0
+        self.pending = {} # path -> Future not yet finished
+        self.stack = [] # Paths waiting for a worker, newest last
+        self.closed = False
+        self.hits = {"memory": 0, "disk": 0, "decoded": 0}
+        self.disk_bytes = 0 # Running estimate of the cache size; prune() recounts it
+        self.pruning = True # The first prune starts below
+        os.makedirs(cache_dir, exist_ok=True)
+        self.threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(max(1, workers))]
+        for t in self.threads:
+            t.start()
+        threading.Thread(target=self.prune, daemon=True).start()
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def get(self, path):
+        """The thumbnail if it's in memory and the file hasn't changed since, else None."""
+        with self.cond:
+            cached = self.memory.get(path)
+            if cached is None:
+                return None
+        if cached[0] != self._mtime(path):
+            return None
+        with self.cond:
+            if path in self.memory:
+                self.memory.move_to_end(path)
+            self.hits["memory"] += 1
+        return cached[1]
+
+    def request(self, path):
+        """A Future for path's thumbnail (a PIL image). Asking again for a waiting path moves it to the front."""
+        thumb = self.get(path)
+        if thumb is not None:
+            future = Future()
+            future.set_result(thumb)
+            return future
+        with self.cond:
+            future = self.pending.get(path)
+            if future is not None and not future.cancelled():
+                if path in self.stack:
+                    self.stack.remove(path)
+                    self.stack.append(path)
+                return future
+            future = self.pending[path] = Future()
+            self.stack.append(path)
+            self.cond.notify()
+        return future
+
+    def cancel(self, keep=()):
+        """Cancels every waiting request except those for paths in keep."""
+        keep = set(keep)
+        with self.cond:
+            for path in [p for p in self.stack if p not in keep]:
+                self.stack.remove(path)
+                self.pending.pop(path).cancel()
+
+    def _worker(self):
+        while True:
+            with self.cond:
+                while not self.stack and not self.closed:
+                    self.cond.wait()
+                if self.closed:
+                    return
+                path = self.stack.pop()
+                future = self.pending[path]
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(self._load(path))
+                except Exception as e:
+                    future.set_exception(e)
+            with self.cond:
+                if self.pending.get(path) is future:
+                    del self.pending[path]
+
+    def _cache_path(self, path, mtime):
+        key = hashlib.sha1(f"{os.path.abspath(path)}|{mtime}|{self.size[0]}x{self.size[1]}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key + ".jpg")
+
+    def _load(self, path):
+        mtime = self._mtime(path)
+        if mtime is None:
+            raise FileNotFoundError(path)
+        cache_path = self._cache_path(path, mtime)
+        try:
+            with Image.open(cache_path) as img:
+                thumb = img.convert("RGB")
+            os.utime(cache_path) # Recently used, for prune()
+            kind = "disk"
+        except OSError:
+            thumb = self._decode(path)
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            thumb.save(cache_path + ".tmp", "JPEG", quality=85)
+            os.replace(cache_path + ".tmp", cache_path)
+            self._written(os.path.getsize(cache_path))
+            kind = "decoded"
+        self._remember(path, mtime, thumb, kind)
+        return thumb
+
+    def _decode(self, path):
+        with Image.open(path) as img:
+            # thumbnail() uses draft() so JPEGs decode at 1/2 to 1/8 scale, and
+            # reduce() to shrink other formats by whole factors before resampling
+            img.thumbnail(self.size, Image.BICUBIC, reducing_gap=2.0)
+            if img.mode in ("RGBA", "LA", "P"):
+                background = Image.new("RGB", img.size, (18, 18, 18))
+                img = img.convert("RGBA")
+                background.paste(img, mask=img.getchannel("A"))
+                return background
+            return img.convert("RGB")
+
+    def _remember(self, path, mtime, thumb, kind):
+        size = thumb.width * thumb.height * len(thumb.getbands())
+        with self.cond:
+            old = self.memory.pop(path, None)
+            if old is not None:
+                self.memory_bytes -= old[1].width * old[1].height * len(old[1].getbands())
+            self.memory[path] = (mtime, thumb)
+            self.memory_bytes += size
+            while self.memory_bytes > self.memory_limit and len(self.memory) > 1:
+                _, (_, evicted) = self.memory.popitem(last=False)
+                self.memory_bytes -= evicted.width * evicted.height * len(evicted.getbands())
+            self.hits[kind] += 1
+
+    def _written(self, size):
+        with self.cond:
+            self.disk_bytes += size
+            if self.disk_bytes <= self.disk_limit or self.pruning:
+                return
+            self.pruning = True
+        self.prune()
+
+    def prune(self):
+        """
+        Deletes the least recently used cached thumbnails until the cache
+        is within 90% of disk_limit, so the next few writes don't start
+        another walk right away. Returns bytes freed.
+        """
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, path))
+        total, freed = sum(f[1] for f in files), 0
+        if total > self.disk_limit:
+            for _, size, path in sorted(files):
+                if total - freed <= self.disk_limit * 0.9:
+                    break
+                try:
+                    os.remove(path)
+                    freed += size
+                except OSError:
+                    pass
+        with self.cond:
+            self.disk_bytes = total - freed
+            self.pruning = False
+        return freed
+
+    def close(self):
+        self.cancel()
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        for t in self.threads:
+            t.join()
@@ -0,0 +1,247 @@
+import os
+import time
+import json
+import queue
+import threading
+from datetime import datetime
+from core.backends import MssBackend
+from core.capture import CaptureManager
+from core.frame import Frame
+from core.save_queue import write_atomic
+
+POLICIES = ("drop", "coalesce")
+
+class TimelapseStats:
+    """
+    Counters for the three timelapse stages, saved as timelapse.stats.json.
+    Encode workers and the grab thread update them concurrently, so
+    changes go through add() and seen_depth().
+    """
+    def __init__(self, interval):
+        self.lock = threading.Lock()
+        self.interval = interval
+        self.grabbed = 0
+        self.encoded = 0
+        self.written = 0
+        self.late = 0 # Grab deadlines missed because the previous grab overran
+        self.dropped = 0 # Frames refused by a full queue
+        self.coalesced = 0 # Queued frames replaced by a newer one
+        self.errors = 0
+        self.bytes_written = 0
+        self.max_depth = {"encode": 0, "write": 0}
+        self.started = None
+        self.ended = None
+
+    def add(self, **counts):
+        """Adds to counters by name, e.g. add(written=1, bytes_written=n)."""
+        with self.lock:
+            for name, n in counts.items():
+                setattr(self, name, getattr(self, name) + n)
+
+    def seen_depth(self, name, depth):
+        with self.lock:
+            self.max_depth[name] = max(self.max_depth[name], depth)
+
+    @property
+    def elapsed(self):
+        return (self.ended or time.monotonic()) - self.started if self.started else 0.0
+
+    def as_dict(self, depth=None):
+        with self.lock:
+            return self._as_dict(depth)
+
+    def _as_dict(self, depth):
+        elapsed = self.elapsed
+        return {
+            "interval_s": self.interval,
+            "elapsed_s": round(elapsed, 2),
+            "grabbed": self.grabbed,
+            "encoded": self.encoded,
+            "written": self.written,
+            "late": self.late,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "written_per_s": round(self.written / elapsed, 2) if elapsed > 0 else 0.0,
+            "mb_per_s": round(self.bytes_written / elapsed / 2 ** 20, 2) if elapsed > 0 else 0.0,
+            "queue_depth": depth or {"encode": 0, "write": 0},
+            "max_queue_depth": dict(self.max_depth),
+        }
+
+class Timelapse:
+    """
+    Screenshots every `interval` seconds, without the preview, into
+    <save_dir>/<date>/timelapse_<time>/NNNNNN.<format>.
+
+    Grab, encode and write run on their own threads and are joined by
+    bounded queues, so a slow disk never delays the next grab. When a
+    queue is full, the "drop" policy discards the new frame; "coalesce"
+    discards the oldest queued one, so what does get written stays as
+    recent as possible. Either way the loss shows up in stats.
+    """
+    def __init__(self, file_manager, interval=None, monitor_index=1, region=None, policy=None, max_queue=None,
+                 limit=None, duration=None, encode_workers=1, backend_factory=MssBackend, capture_manager=None):
+        config = file_manager.config
+        self.file_manager = file_manager
+        self.interval = interval if interval is not None else config.get("timelapse_interval_ms", 1000) / 1000.0
+        self.policy = policy or config.get("timelapse_policy", "coalesce")
+        if self.policy not in POLICIES:
+            self.policy = "coalesce"
+        max_queue = max_queue or int(config.get("timelapse_queue", 4))
+        self.monitor_index = monitor_index
+        self.region = region
+        self.limit = limit
+        self.duration = duration
+        self.capture_manager = capture_manager or CaptureManager(backend_factory)
+        self.encode_queue = queue.Queue(maxsize=max_queue)
+        self.write_queue = queue.Queue(maxsize=max_queue * 4) # Encoded frames are much smaller
+        self.encode_workers = max(1, encode_workers)
+        self.stats = TimelapseStats(self.interval)
+        self.stop_event = threading.Event()
+        self.output_dir = None
+        self.on_complete = None
+        self.thread = None
+
+    @property
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    @property
+    def queue_depth(self):
+        return {"encode": self.encode_queue.qsize(), "write": self.write_queue.qsize()}
+
+    def start(self, on_complete=None):
+        """Starts the pipeline; on_complete(stats) runs on the grab thread once everything is written."""
+        if self.is_running:
+            return None
+        self.on_complete = on_complete
+        today = datetime.now().strftime("%Y-%m-%d")
+        name = f"timelapse_{datetime.now().strftime('%H-%M-%S')}"
+        self.output_dir = os.path.join(self.file_manager.config["save_dir"], today, name)
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self.output_dir
+
+    def stop(self):
+        """Stops grabbing; queued frames are still encoded and written."""
+        self.stop_event.set()
+
+    def join(self, timeout=None):
+        if self.thread:
+            self.thread.join(timeout)
+
+    def _offer(self, q, item, name):
+        try:
+            q.put_nowait(item)
+        except queue.Full:
+            if self.policy == "coalesce":
+                try:
+                    q.get_nowait()
+                    self.stats.add(coalesced=1)
+                except queue.Empty:
+                    pass
+                try:
+                    q.put_nowait(item)
+                except queue.Full:
+                    self.stats.add(dropped=1)
+            else:
+                self.stats.add(dropped=1)
+        self.stats.seen_depth(name, q.qsize())
+
+    def _run(self):
+        stats = self.stats
+        stats.started = time.monotonic()
+        encoders = [threading.Thread(target=self._encode_loop, daemon=True) for _ in range(self.encode_workers)]
+        writer = threading.Thread(target=self._write_loop, daemon=True)
+        for t in encoders + [writer]:
+            t.start()
+        try:
+            self._grab_loop()
+        finally:
+            # Drain downstream in order: encoders finish their queue, then the writer
+            for _ in encoders:
+                self.encode_queue.put(None)
+            for t in encoders:
+                t.join()
+            self.write_queue.put(None)
+            writer.join()
+            stats.ended = time.monotonic()
+            self.save_stats()
+            if self.on_complete:
+                self.on_complete(stats)
+
+    def _grab_loop(self):
+        with self.capture_manager.backend_factory() as sct:
+            self._grab_frames(sct)
+
+    def _grab_frames(self, sct):
+        monitors = sct.monitors
+        if self.region:
+            left, top, width, height = self.region
+            monitor = {"left": left, "top": top, "width": width, "height": height}
+        else:
+            monitor = monitors[self.monitor_index if self.monitor_index < len(monitors) else 0]
+        deadline = time.monotonic()
+        index = 0
+        while not self.stop_event.is_set():
+            if self.limit is not None and index >= self.limit:
+                break
+            if self.duration is not None and time.monotonic() - self.stats.started >= self.duration:
+                break
+            try:
+                shot = sct.grab(monitor)
+            except Exception as e:
+                print(f"Timelapse grab error: {e}")
+                self.stats.add(errors=1)
+            else:
+                index += 1
+                self.stats.add(grabbed=1)
+                self._offer(self.encode_queue, (index, Frame.from_shot(shot)), "encode")
+            # Absolute deadlines; deadlines already passed are skipped, not queued up
+            deadline += self.interval
+            now = time.monotonic()
+            if now > deadline:
+                missed = int((now - deadline) / self.interval) + 1
+                self.stats.add(late=missed)
+                deadline += missed * self.interval
+            self.stop_event.wait(deadline - time.monotonic())
+
+    def _encode_loop(self):
+        ext = self.file_manager.config["format"].lower()
+        while True:
+            item = self.encode_queue.get()
+            if item is None:
+                break
+            index, frame = item
+            try:
+                data = self.file_manager.encode(frame)
+            except Exception as e:
+                print(f"Timelapse encode error: {e}")
+                self.stats.add(errors=1)
+                continue
+            self.stats.add(encoded=1)
+            path = os.path.join(self.output_dir, f"{index:06d}.{ext}")
+            self._offer(self.write_queue, (path, data), "write")
+
+    def _write_loop(self):
+        while True:
+            item = self.write_queue.get()
+            if item is None:
+                break
+            path, data = item
+            try:
+                write_atomic(path, data)
+                self.file_manager.add_to_history(path)
+            except Exception as e:
+                print(f"Timelapse write error: {e}")
+                self.stats.add(errors=1)
+                continue
+            self.stats.add(written=1, bytes_written=len(data))
+
+    def save_stats(self):
+        path = os.path.join(self.output_dir, "timelapse.stats.json")
+        with open(path, "w") as f:
+            json.dump(self.stats.as_dict(self.queue_depth), f, indent=4)
+        return path
@@ -0,0 +1,186 @@
+import time
+import zlib
+import threading
+from PIL import ImageChops
+from core.backends import MssBackend
+from core.capture import CaptureManager
+from core.frame import Frame
+from utils.frame_ops import to_pil
+
+def merge_boxes(boxes, gap=0):
+    """Merges (left, top, right, bottom) boxes that overlap or lie within `gap` pixels of each other."""
+    boxes = [list(b) for b in boxes]
+    merged = True
+    while merged:
+        merged = False
+        out = []
+        for box in boxes:
+            for other in out:
+                if box[0] <= other[2] + gap and other[0] <= box[2] + gap and box[1] <= other[3] + gap and other[1] <= box[3] + gap:
+                    other[0], other[1] = min(other[0], box[0]), min(other[1], box[1])
+                    other[2], other[3] = max(other[2], box[2]), max(other[3], box[3])
+                    merged = True
+                    break
+            else:
+                out.append(box)
+        boxes = out
+    return [tuple(b) for b in boxes]
+
+class TileDiff:
+    """
+    Finds what changed between consecutive BGRA frames of one size, in
+    three passes that each narrow the work for the next:
+
+    1. one crc32 per row, compared with the previous frame's;
+    2. per-tile crc32s, only in tile bands that contain a changed row;
+    3. a pixel diff (per-channel tolerance) only on tiles whose hash changed.
+
+    update() returns (changed_pixels, boxes) where boxes are the merged
+    bounding boxes of the changed pixels.
+    """
+    def __init__(self, size, tile=64, tolerance=16):
+        self.size = size
+        self.tile = tile
+        self.tolerance = tolerance
+        self.prev = None
+        self.row_hashes = None
+        self.tile_hashes = {}
+
+    def _row_hashes(self, raw):
+        stride = self.size[0] * 4
+        view = memoryview(raw)
+        return [zlib.crc32(view[y * stride:(y + 1) * stride]) for y in range(self.size[1])]
+
+    def _tile_hash(self, view, tx, ty):
+        w, h = self.size
+        stride, t = w * 4, self.tile
+        left, right = tx * t * 4, min(w, (tx + 1) * t) * 4
+        crc = 0
+        for y in range(ty * t, min(h, (ty + 1) * t)):
+            crc = zlib.crc32(view[y * stride + left:y * stride + right], crc)
+        return crc
+
+    def _pixel_diff(self, raw, box):
+        before = to_pil(self.prev, self.size, crop=box)
+        after = to_pil(raw, self.size, crop=box)
+        mask = ImageChops.difference(before, after).convert("L").point(lambda v: 255 if v > self.tolerance else 0)
+        return mask.histogram()[255], mask.getbbox()
+
+    def update(self, raw):
+        w, h = self.size
+        rows = self._row_hashes(raw)
+        if self.prev is None:
+            self.prev, self.row_hashes = raw, rows
+            return w * h, [(0, 0, w, h)]
+
+        t, view = self.tile, memoryview(raw)
+        bands = sorted({y // t for y in range(h) if rows[y] != self.row_hashes[y]})
+        changed, boxes = 0, []
+        for ty in bands:
+            for tx in range((w + t - 1) // t):
+                crc = self._tile_hash(view, tx, ty)
+                old = self.tile_hashes.get((tx, ty))
+                self.tile_hashes[(tx, ty)] = crc
+                if old is None:
+                    old = self._tile_hash(memoryview(self.prev), tx, ty)
+                if crc == old:
+                    continue
+                box = (tx * t, ty * t, min(w, (tx + 1) * t), min(h, (ty + 1) * t))
+                count, bbox = self._pixel_diff(raw, box)
+                if bbox:
+                    changed += count
+                    boxes.append((box[0] + bbox[0], box[1] + bbox[1], box[0] + bbox[2], box[1] + bbox[3]))
+        self.prev, self.row_hashes = raw, rows
+        return changed, merge_boxes(boxes, gap=t // 4)
+
+class RegionWatcher:
+    """
+    Polls a screen region and saves a screenshot only when enough pixels
+    change: at least `threshold` of the region's area, each by more than
+    `tolerance` in some channel. While the region stays static the poll
+    interval backs off from min_interval to max_interval; any change
+    snaps it back. The changed boxes (relative to the region) go into the
+    saved screenshot's history entry under "watch".
+    """
+    def __init__(self, file_manager, region, min_interval=None, max_interval=None, threshold=None, tolerance=None,
+                 tile=None, backoff=1.5, backend_factory=MssBackend, capture_manager=None):
+        config = file_manager.config
+        self.file_manager = file_manager
+        self.region = region # (x, y, width, height)
+        self.min_interval = min_interval or config.get("watch_min_interval_ms", 250) / 1000.0
+        self.max_interval = max_interval or config.get("watch_max_interval_ms", 5000) / 1000.0
+        self.threshold = threshold if threshold is not None else config.get("watch_threshold", 0.001)
+        self.tolerance = tolerance if tolerance is not None else config.get("watch_tolerance", 16)
+        self.tile = tile or int(config.get("watch_tile", 64))
+        self.backoff = backoff
+        self.capture_manager = capture_manager or CaptureManager(backend_factory)
+        self.interval = self.min_interval
+        self.polls = 0
+        self.saved = 0
+        self.diff_time = 0.0
+        self.last_path = None
+        self.on_save = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    @property
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, on_save=None):
+        """on_save(path, boxes) is called on the watch thread after each save."""
+        if self.is_running:
+            return
+        self.on_save = on_save
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._watch_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def join(self, timeout=None):
+        if self.thread:
+            self.thread.join(timeout)
+
+    def _watch_loop(self):
+        # A handle of its own, closed when the session ends; the shared
+        # CaptureManager would keep one per watch thread until quit
+        with self.capture_manager.backend_factory() as sct:
+            self._watch(sct)
+
+    def _watch(self, sct):
+        x, y, w, h = self.region
+        monitor = {"top": y, "left": x, "width": w, "height": h}
+        diff = None
+        while not self.stop_event.is_set():
+            try:
+                shot = sct.grab(monitor)
+            except Exception as e:
+                print(f"Watch grab error: {e}")
+                self.stop_event.wait(self.max_interval)
+                continue
+            self.polls += 1
+            if diff is None or diff.size != shot.size:
+                diff = TileDiff(shot.size, self.tile, self.tolerance)
+            start = time.perf_counter()
+            changed, boxes = diff.update(shot.raw)
+            self.diff_time += time.perf_counter() - start
+
+            if changed and changed >= self.threshold * shot.size[0] * shot.size[1]:
+                self.interval = self.min_interval
+                self._save(shot, changed, boxes)
+            else:
+                self.interval = min(self.max_interval, self.interval * self.backoff)
+            self.stop_event.wait(self.interval)
+
+    def _save(self, shot, changed, boxes):
+        metadata = {"watch": {"region": list(self.region), "changed_pixels": changed, "boxes": [list(b) for b in boxes]}}
+        try:
+            self.last_path = self.file_manager.save_screenshot(Frame.from_shot(shot), metadata=metadata, dedupe=False) # A change is the point
+        except Exception as e:
+            print(f"Watch save error: {e}")
+            return
+        self.saved += 1
+        if self.on_save:
+            self.on_save(self.last_path, boxes)
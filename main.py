@@ -1,16 +1,23 @@
 import tkinter as tk
 from tkinter import messagebox, filedialog, simpledialog
-import sys
 import os
-import io
-from PIL import Image, ImageTk, ImageGrab
+from PIL import Image, ImageTk
 import threading
+import argparse
+import json
 
-import mss
-from core.capture import CaptureManager
+from core.capture import CaptureManager, CaptureService
+from core.frame import Frame
 from core.manager import FileManager
-from core.recorder import ScreenRecorder
+from core.recorder import ScreenRecorder, FPS_CHOICES
+from core.timelapse import Timelapse, POLICIES
+from core.watch import RegionWatcher
+from core import encoders
+from core.retention import RetentionDaemon
+from core.dedupe import dedupe_folder, IMAGE_TYPES
+from core.annotations import Annotation, AnnotationDocument
 from utils.image_processor import ImageProcessor
+from utils.frame_ops import to_pil
 
 class ScreenshotApp:
     def __init__(self):
@@ -25,12 +32,18 @@ class ScreenshotApp:
         except Exception: pass
 
         self.capture_manager = CaptureManager()
+        self.capture_service = CaptureService(self.capture_manager)
         self.file_manager = FileManager()
         self.image_processor = ImageProcessor()
-        self.recorder = ScreenRecorder(self.file_manager)
+        self.recorder = ScreenRecorder(self.file_manager, capture_manager=self.capture_manager)
 
         self.setup_ui()
         self.setup_integrator()
+        if self.file_manager.config.get("replay_enabled", False):
+            self.recorder.start_replay(1)
+        self.retention = RetentionDaemon(self.file_manager)
+        if self.file_manager.config.get("retention_enabled", False):
+            self.retention.start(on_report=lambda report: self.root.after(0, lambda: self.show_reclaimed(report)))
 
         self.root.bind("<ButtonPress-1>", self.start_drag)
         self.root.bind("<B1-Motion>", self.on_drag)
@@ -53,9 +66,12 @@ class ScreenshotApp:
         self.create_btn(container, "🚀", "Auto", self.capture_auto_save).pack(side=tk.LEFT, padx=3)
         self.btn_rec = self.create_btn(container, "⏺️", "Rec", self.toggle_recording)
         self.btn_rec.pack(side=tk.LEFT, padx=3)
+        self.create_btn(container, "⏱️", "Lapse", self.start_timelapse).pack(side=tk.LEFT, padx=3)
+        self.create_btn(container, "👁️", "Watch", self.start_watch).pack(side=tk.LEFT, padx=3)
+        self.create_btn(container, "🕘", "Hist", self.open_history).pack(side=tk.LEFT, padx=3)
         self.create_btn(container, "⚙️", "Sett", self.open_settings).pack(side=tk.LEFT, padx=3)
         
-        close_btn = tk.Button(container, text="✕", command=self.root.destroy, bg="#333", fg="white", 
+        close_btn = tk.Button(container, text="✕", command=self.quit, bg="#333", fg="white", 
                              relief="flat", font=("Arial", 10), padx=8, pady=4, activebackground="#e81123", activeforeground="white")
         close_btn.pack(side=tk.LEFT, padx=3)
         close_btn.bind("<Enter>", lambda e: close_btn.config(bg="#e81123"))
@@ -72,7 +88,8 @@ class ScreenshotApp:
         try:
             from pynput import keyboard
             def on_activate(): self.root.after(0, self.start_region_capture)
-            self.hotkey = keyboard.GlobalHotKeys({'<ctrl>+<shift>+s': on_activate})
+            def on_replay(): self.root.after(0, self.save_replay)
+            self.hotkey = keyboard.GlobalHotKeys({'<ctrl>+<shift>+s': on_activate, '<ctrl>+<shift>+r': on_replay})
             self.hotkey.start()
         except: pass
 
@@ -84,24 +101,51 @@ class ScreenshotApp:
         y = self.root.winfo_y() + (event.y - self.y)
         self.root.geometry(f"+{x}+{y}")
 
-    def start_region_capture(self):
+    def start_region_capture(self, callback=None):
+        # Freeze the screen now; the overlay shows this frame and the
+        # selection crops it, so nothing is grabbed after the mouse is released
         self.root.withdraw()
-        SelectionOverlay(self.on_region_selected)
+        # Give the window manager time to unmap the window, as for full-screen captures
+        self.root.after(150, self._freeze_region, callback)
+
+    def _freeze_region(self, callback=None):
+        self.frozen = self.capture_manager.grab_raw(0)
+        SelectionOverlay(callback or self.on_region_selected, self.capture_manager, self.frozen)
 
     def on_region_selected(self, x, y, w, h):
         self.root.deiconify()
+        shot, self.frozen = self.frozen, None
         if w > 5 and h > 5:
-            img = self.capture_manager.capture_region(x, y, w, h)
-            path = self.file_manager.save_screenshot(img)
-            self.show_preview(img, path)
+            frame = CaptureManager.crop_shot(shot, x, y, w, h)
+            self.show_preview(frame, self.file_manager.save_async(frame).path)
 
     def capture_full_screen(self):
         self.root.withdraw()
         self.root.after(150, self._do_full_capture)
 
     def _do_full_capture(self):
-        img = self.capture_manager.capture_full_screen(1)
-        path = self.file_manager.save_screenshot(img)
+        # 0 = every monitor, grabbed in parallel and stitched; 1+ = one monitor
+        monitor = int(self.file_manager.config.get("full_screen_monitor", 1))
+        if monitor == 0:
+            future = self.capture_service.submit(CaptureManager.capture_all_monitors)
+        else:
+            future = self.capture_service.submit(CaptureManager.capture_frame, monitor)
+        self._on_captured(future, self._show_full_capture)
+
+    def _on_captured(self, future, handler):
+        """Hands a capture or save future's result to handler on the Tk thread."""
+        def done(f):
+            error = f.exception()
+            self.root.after(0, lambda: self._capture_failed(error) if error else handler(f.result()))
+        future.add_done_callback(done)
+
+    def _capture_failed(self, error):
+        self.root.deiconify()
+        self.status_label.config(text="❌ Capture failed", fg="#e81123")
+        print(f"Capture Error: {error}")
+
+    def _show_full_capture(self, img):
+        path = self.file_manager.save_async(img).path
         self.root.deiconify()
         self.show_preview(img, path)
 
@@ -110,12 +154,24 @@ class ScreenshotApp:
         self.root.after(150, self._do_auto_capture)
 
     def _do_auto_capture(self):
-        img = self.capture_manager.capture_full_screen(1)
-        path = self.file_manager.save_screenshot(img)
+        self._on_captured(self.capture_service.submit(CaptureManager.capture_frame, 1), self._save_auto_capture)
+
+    def _save_auto_capture(self, img):
         self.root.deiconify()
+        self._on_captured(self.file_manager.save_async(img), self._auto_capture_saved)
+
+    def _auto_capture_saved(self, path):
         self.status_label.config(text="✅ Saved!", fg="#4CAF50")
         self.root.after(2000, lambda: self.status_label.config(text="", fg="#aaa"))
 
+    def save_replay(self):
+        if not self.recorder.is_replaying: return
+        def on_save_done(path):
+            self.root.after(0, lambda: self.status_label.config(text="✅ Replay saved!", fg="#4CAF50"))
+            self.root.after(2000, lambda: self.status_label.config(text="", fg="#aaa"))
+        if self.recorder.save_replay(callback=on_save_done):
+            self.status_label.config(text="⏳ Saving replay...")
+
     def toggle_recording(self):
         if self.recorder.is_saving: return
         if not self.recorder.is_recording:
@@ -129,11 +185,22 @@ class ScreenshotApp:
         self.rec_ui = tk.Toplevel()
         self.rec_ui.overrideredirect(True)
         self.rec_ui.attributes("-topmost", True)
-        self.rec_ui.geometry("140x50+20+20")
+        self.rec_ui.geometry("140x84+20+20")
         self.rec_ui.configure(bg="#222")
+        self.btn_pause = tk.Button(self.rec_ui, text="Pause", bg="#333", fg="white", font=("Arial", 9),
+                                   relief="flat", command=self.toggle_pause)
+        self.btn_pause.pack(fill=tk.X, padx=4, pady=(4, 0))
         tk.Button(self.rec_ui, text="Stop Recording", bg="#d83b01", fg="white", font=("Arial", 10, "bold"), 
                   relief="flat", command=self.stop_recording).pack(fill=tk.BOTH, expand=True, padx=4, pady=4)
 
+    def toggle_pause(self):
+        if self.recorder.is_paused:
+            self.recorder.resume_recording()
+            self.btn_pause.config(text="Pause", bg="#333")
+        else:
+            self.recorder.pause_recording()
+            self.btn_pause.config(text="Resume", bg="#0078d7")
+
     def stop_recording(self):
         if hasattr(self, 'rec_ui'): 
             try: self.rec_ui.destroy()
@@ -153,29 +220,117 @@ class ScreenshotApp:
         try: os.startfile(os.path.dirname(path))
         except: pass
 
+    def start_timelapse(self):
+        if self.recorder.is_recording or getattr(self, "timelapse", None) and self.timelapse.is_running: return
+        self.root.withdraw()
+        self.timelapse = Timelapse(self.file_manager, capture_manager=self.capture_manager)
+        self.timelapse.start(on_complete=lambda stats: self.root.after(0, self.finalize_timelapse))
+        self.lapse_ui = tk.Toplevel()
+        self.lapse_ui.overrideredirect(True)
+        self.lapse_ui.attributes("-topmost", True)
+        self.lapse_ui.geometry("160x84+20+20")
+        self.lapse_ui.configure(bg="#222")
+        self.lapse_label = tk.Label(self.lapse_ui, text="", fg="#aaa", bg="#222", font=("Arial", 8))
+        self.lapse_label.pack(fill=tk.X, padx=4, pady=(4, 0))
+        tk.Button(self.lapse_ui, text="Stop Timelapse", bg="#d83b01", fg="white", font=("Arial", 10, "bold"),
+                  relief="flat", command=self.stop_timelapse).pack(fill=tk.BOTH, expand=True, padx=4, pady=4)
+        self.update_timelapse_ui()
+
+    def update_timelapse_ui(self):
+        if not self.timelapse.is_running: return
+        stats, depth = self.timelapse.stats, self.timelapse.queue_depth
+        self.lapse_label.config(text=f"{stats.written} saved · q {depth['encode']}/{depth['write']} · lost {stats.dropped + stats.coalesced}")
+        self.root.after(1000, self.update_timelapse_ui)
+
+    def stop_timelapse(self):
+        try: self.lapse_ui.destroy()
+        except: pass
+        self.root.deiconify()
+        self.status_label.config(text="⏳ Writing...")
+        self.timelapse.stop()
+
+    def finalize_timelapse(self):
+        self.status_label.config(text="")
+        try: os.startfile(self.timelapse.output_dir)
+        except: pass
+
+    def start_watch(self):
+        if getattr(self, "watcher", None) and self.watcher.is_running: return
+        self.start_region_capture(self.on_watch_selected)
+
+    def on_watch_selected(self, x, y, w, h):
+        shot, self.frozen = self.frozen, None
+        if w <= 5 or h <= 5:
+            self.root.deiconify()
+            return
+        # Overlay coordinates are relative to the virtual screen
+        left, top = shot.pos
+        self.watcher = RegionWatcher(self.file_manager, (left + x, top + y, w, h), capture_manager=self.capture_manager)
+        self.watcher.start()
+        self.watch_ui = tk.Toplevel()
+        self.watch_ui.overrideredirect(True)
+        self.watch_ui.attributes("-topmost", True)
+        self.watch_ui.geometry("160x84+20+20")
+        self.watch_ui.configure(bg="#222")
+        self.watch_label = tk.Label(self.watch_ui, text="", fg="#aaa", bg="#222", font=("Arial", 8))
+        self.watch_label.pack(fill=tk.X, padx=4, pady=(4, 0))
+        tk.Button(self.watch_ui, text="Stop Watching", bg="#d83b01", fg="white", font=("Arial", 10, "bold"),
+                  relief="flat", command=self.stop_watch).pack(fill=tk.BOTH, expand=True, padx=4, pady=4)
+        self.update_watch_ui()
+
+    def update_watch_ui(self):
+        if not self.watcher.is_running: return
+        self.watch_label.config(text=f"{self.watcher.saved} saved · every {self.watcher.interval:.1f}s")
+        self.root.after(1000, self.update_watch_ui)
+
+    def stop_watch(self):
+        self.watcher.stop()
+        try: self.watch_ui.destroy()
+        except: pass
+        self.root.deiconify()
+
+    def show_reclaimed(self, report):
+        print(f"Retention: {report.as_dict()}")
+        if report.reclaimed_bytes:
+            self.status_label.config(text=f"🧹 {report.reclaimed_bytes / 2 ** 20:.0f} MB freed", fg="#aaa")
+            self.root.after(4000, lambda: self.status_label.config(text=""))
+
     def show_preview(self, img, path=None):
         PreviewWindow(img, self.file_manager, self.image_processor, saved_path=path)
 
     def open_settings(self):
         SettingsWindow(self.file_manager)
 
+    def open_history(self):
+        HistoryWindow(self)
+
+    def quit(self):
+        self.retention.stop()
+        self.capture_service.close()
+        self.file_manager.close() # Finish pending saves
+        self.root.destroy()
+
     def run(self):
         self.root.mainloop()
 
 class SelectionOverlay:
-    def __init__(self, callback):
+    def __init__(self, callback, capture_manager, frozen=None):
         self.callback = callback
         self.win = tk.Toplevel()
-        with mss.mss() as sct:
-            vscr = sct.monitors[0]
-            self.win.geometry(f"{vscr['width']}x{vscr['height']}+{vscr['left']}+{vscr['top']}")
+        vscr = capture_manager.get_monitors()[0]
+        self.win.geometry(f"{vscr['width']}x{vscr['height']}+{vscr['left']}+{vscr['top']}")
         
-        self.win.attributes("-alpha", 0.35, "-topmost", True)
+        # Opaque over a dimmed copy of the frozen frame; translucent over the live screen otherwise
+        self.win.attributes("-alpha", 1.0 if frozen else 0.35, "-topmost", True)
         self.win.overrideredirect(True)
         self.win.configure(bg="#000")
         
         self.canvas = tk.Canvas(self.win, highlightthickness=0, bg="#000", cursor="tcross")
         self.canvas.pack(fill=tk.BOTH, expand=True)
+        if frozen:
+            dimmed = to_pil(frozen.raw, frozen.size).point(lambda v: v * 6 // 10)
+            self.tk_img = ImageTk.PhotoImage(dimmed)
+            self.canvas.create_image(0, 0, anchor=tk.NW, image=self.tk_img)
         
         self.start_x = self.start_y = self.rect = None
         self.v_line = self.h_line = None
@@ -184,7 +339,12 @@ class SelectionOverlay:
         self.win.bind("<B1-Motion>", self.on_drag)
         self.win.bind("<ButtonRelease-1>", self.on_release)
         self.win.bind("<Motion>", self.draw_crosshair)
-        self.win.bind("<Escape>", lambda e: self.win.destroy())
+        self.win.bind("<Escape>", self.cancel)
+        self.win.focus_force()
+
+    def cancel(self, event=None):
+        self.win.destroy()
+        self.callback(0, 0, 0, 0)
 
     def draw_crosshair(self, event):
         if self.v_line: self.canvas.delete(self.v_line)
@@ -207,10 +367,12 @@ class SelectionOverlay:
         self.callback(int(min(coords[0], coords[2])), int(min(coords[1], coords[3])), int(abs(coords[2]-coords[0])), int(abs(coords[3]-coords[1])))
 
 class PreviewWindow:
-    def __init__(self, pil_img, file_manager, processor, saved_path=None):
-        self.pil_img, self.file_manager, self.processor, self.saved_path = pil_img, file_manager, processor, saved_path
+    def __init__(self, image, file_manager, processor, saved_path=None):
+        # The capture may still be queued for saving; the document never draws on it
+        self.doc, self.file_manager, self.processor, self.saved_path = AnnotationDocument(image), file_manager, processor, saved_path
         self.tool, self.temp_shape = "none", None
         self.scale = 1.0 # Current display scale
+        self.patches = [] # PhotoImages of areas redrawn since the last full render
         
         self.win = tk.Toplevel()
         self.win.title("LightShot Editor")
@@ -222,7 +384,8 @@ class PreviewWindow:
         
         tk.Button(controls, text="💾 Save Edits", command=self.save, bg="#0078d7", fg="white", relief="flat", padx=15, pady=4).pack(side=tk.LEFT, padx=10)
         
-        tools = [("📋 Copy", self.copy_to_clipboard), ("🌫️ Blur", lambda: self.set_tool("blur")), 
+        tools = [("↶", self.undo), ("↷", self.redo),
+                 ("📋 Copy", self.copy_to_clipboard), ("🌫️ Blur", lambda: self.set_tool("blur")), 
                  ("✏️ Pen", lambda: self.set_tool("pen")), ("⬜ Rect", lambda: self.set_tool("rect")), 
                  ("↗️ Arrow", lambda: self.set_tool("arrow")), ("T Text", lambda: self.set_tool("text")), 
                  ("© Mark", self.apply_watermark)]
@@ -240,38 +403,56 @@ class PreviewWindow:
         self.canvas.bind("<ButtonPress-1>", self.start_action)
         self.canvas.bind("<B1-Motion>", self.on_action)
         self.canvas.bind("<ButtonRelease-1>", self.end_action)
+        self.win.bind("<Control-z>", lambda e: self.undo())
+        self.win.bind("<Control-y>", lambda e: self.redo())
+        self.win.bind("<Control-Z>", lambda e: self.redo())
+
+    def undo(self):
+        box = self.doc.undo()
+        if box: self.update_canvas(box)
+
+    def redo(self):
+        box = self.doc.redo()
+        if box: self.update_canvas(box)
 
     def set_tool(self, tool): self.tool = tool; self.canvas.config(cursor="tcross")
 
     def apply_watermark(self):
         txt = simpledialog.askstring("Watermark", "Text:", parent=self.win)
-        if txt: self.pil_img = self.processor.add_watermark(self.pil_img, txt); self.update_canvas()
+        if txt:
+            box = self.doc.apply(Annotation("watermark", text=self.processor.watermark_text(txt)))
+            if box: self.update_canvas(box)
 
     def copy_to_clipboard(self):
         import win32clipboard
-        output = io.BytesIO()
-        self.pil_img.convert("RGB").save(output, "BMP")
-        data = output.getvalue()[14:]
+        data = self.doc.flatten().dib()
         win32clipboard.OpenClipboard()
         win32clipboard.EmptyClipboard()
         win32clipboard.SetClipboardData(win32clipboard.CF_DIB, data)
         win32clipboard.CloseClipboard()
         messagebox.showinfo("📋", "Copied to clipboard!")
 
-    def update_canvas(self):
-        limit_w, limit_h = self.win.winfo_screenwidth()-80, self.win.winfo_screenheight()-120
-        disp = self.pil_img.copy()
-        self.scale = 1.0
-        if disp.width > limit_w or disp.height > limit_h:
-            # Calculate scale
-            self.scale = min(limit_w / disp.width, limit_h / disp.height)
-            new_size = (int(disp.width * self.scale), int(disp.height * self.scale))
-            disp = disp.resize(new_size, Image.Resampling.LANCZOS)
-            
-        self.tk_img = ImageTk.PhotoImage(disp)
-        self.canvas.config(width=disp.width, height=disp.height)
-        self.canvas.delete("all")
-        self.canvas.create_image(0, 0, anchor=tk.NW, image=self.tk_img)
+    def update_canvas(self, box=None):
+        """Redraws the whole canvas, or with box (image coordinates) just that area as a patch on top."""
+        if box is None or len(self.patches) >= 64:
+            limit_w, limit_h = self.win.winfo_screenwidth()-80, self.win.winfo_screenheight()-120
+            view = self.doc.base if self.doc.image is None else Frame.from_pil(self.doc.image)
+            disp, self.scale = view.fit(limit_w, limit_h)
+            self.tk_img = ImageTk.PhotoImage(disp)
+            self.disp_size, self.patches = disp.size, []
+            self.canvas.config(width=disp.width, height=disp.height)
+            self.canvas.delete("all")
+            self.canvas.create_image(0, 0, anchor=tk.NW, image=self.tk_img)
+            return
+        # Only the dirty area is scaled and handed to Tk
+        s, (dw, dh) = self.scale, self.disp_size
+        l, t = max(0, int(box[0] * s) - 1), max(0, int(box[1] * s) - 1)
+        r, b = min(dw, int(box[2] * s) + 2), min(dh, int(box[3] * s) + 2)
+        if r <= l or b <= t: return
+        img = self.doc.view()
+        patch = img.crop((l, t, r, b)) if s == 1.0 else img.resize((r - l, b - t), Image.Resampling.LANCZOS, box=(l / s, t / s, r / s, b / s))
+        self.patches.append(ImageTk.PhotoImage(patch))
+        self.canvas.create_image(l, t, anchor=tk.NW, image=self.patches[-1])
 
     def start_action(self, event):
         if self.tool == "none": return
@@ -281,11 +462,11 @@ class PreviewWindow:
         if self.tool == "none": return
         if self.tool == "pen":
             self.points.append((event.x, event.y))
-            self.canvas.create_line(self.points[-2], self.points[-1], fill="#ff0000", width=2)
+            self.canvas.create_line(self.points[-2], self.points[-1], fill="#ff0000", width=2, tags="temp")
         else:
             if self.temp_shape: self.canvas.delete(self.temp_shape)
-            if self.tool in ["rect", "blur"]: self.temp_shape = self.canvas.create_rectangle(self.start_x, self.start_y, event.x, event.y, outline="#ff0000", width=2)
-            elif self.tool == "arrow": self.temp_shape = self.canvas.create_line(self.start_x, self.start_y, event.x, event.y, arrow=tk.LAST, fill="#ff0000", width=2)
+            if self.tool in ["rect", "blur"]: self.temp_shape = self.canvas.create_rectangle(self.start_x, self.start_y, event.x, event.y, outline="#ff0000", width=2, tags="temp")
+            elif self.tool == "arrow": self.temp_shape = self.canvas.create_line(self.start_x, self.start_y, event.x, event.y, arrow=tk.LAST, fill="#ff0000", width=2, tags="temp")
 
     def end_action(self, event):
         if self.tool == "none": return
@@ -295,30 +476,154 @@ class PreviewWindow:
         x2, y2 = int(event.x * inv), int(event.y * inv)
         
         l, r, t, b = min(x1, x2), max(x1, x2), min(y1, y2), max(y1, y2)
+        self.canvas.delete("temp"); self.temp_shape = None
+        command = None
+        if self.tool == "blur" and r > l and b > t: command = Annotation("blur", [(l, t), (r, b)])
+        elif self.tool == "pen": command = Annotation("pen", [(int(px * inv), int(py * inv)) for px, py in self.points])
+        elif self.tool == "rect": command = Annotation("rect", [(l, t), (r, b)])
+        elif self.tool == "arrow": command = Annotation("arrow", [(x1, y1), (x2, y2)])
+        elif self.tool == "text":
+            txt = simpledialog.askstring("T", "Text:", parent=self.win)
+            if txt: command = Annotation("text", [(x1, y1)], text=txt)
         try:
-            if self.tool == "blur" and r > l: self.pil_img = self.processor.apply_blur(self.pil_img, (l, t, r, b))
-            elif self.tool == "pen":
-                scaled_points = [(int(px * inv), int(py * inv)) for px, py in self.points]
-                self.pil_img = self.processor.draw_annotation(self.pil_img, "pen", None, None, points=scaled_points)
-            elif self.tool == "rect": self.pil_img = self.processor.draw_annotation(self.pil_img, "rect", (l, t), (r, b))
-            elif self.tool == "arrow": self.pil_img = self.processor.draw_annotation(self.pil_img, "arrow", (x1, y1), (x2, y2))
-            elif self.tool == "text":
-                txt = simpledialog.askstring("T", "Text:", parent=self.win)
-                if txt: self.pil_img = self.processor.draw_annotation(self.pil_img, "text", (x1, y1), None, text=txt)
+            box = self.doc.apply(command) if command else None
+            if box: self.update_canvas(box)
         except Exception as e: print(e)
-        self.update_canvas()
 
     def save(self):
-        p = self.file_manager.save_screenshot(self.pil_img, path=self.saved_path)
+        # One handover of the composite; nothing is replayed or copied here
+        p = self.file_manager.save_async(self.doc.flatten(), path=self.saved_path).path
         messagebox.showinfo("✅", f"Updated: {os.path.basename(p)}")
         self.win.destroy()
 
+class HistoryWindow:
+    """
+    Grid of past captures, newest first. Only the cells in view exist on
+    the canvas. Entries are read a page at a time, and thumbnails come
+    from the FileManager's ThumbnailService, so opening and scrolling cost
+    the same with a hundred captures as with a hundred thousand.
+    """
+    PAGE = 200
+    KINDS = tuple(t.lstrip(".") for t in IMAGE_TYPES) + ("gif",)
+
+    def __init__(self, app):
+        self.app, self.fm = app, app.file_manager
+        self.thumbs = self.fm.thumbnails
+        self.thumb_w, self.thumb_h = self.thumbs.size
+        self.cell_w, self.cell_h = self.thumb_w + 16, self.thumb_h + 28
+        self.total = self.fm.history.count(type=self.KINDS)
+        self.pages = {} # page number -> entries
+        self.cells = {} # index -> canvas items for entries in view
+        self.photos = {} # index -> PhotoImage; Tk drops images nothing references
+        self.cols = 1
+        self.closed = False
+
+        self.win = tk.Toplevel()
+        self.win.title(f"LightShot History ({self.total})")
+        self.win.geometry(f"{self.cell_w * 4 + 20}x600")
+        self.win.configure(bg="#121212")
+        scrollbar = tk.Scrollbar(self.win, command=self.scroll)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas = tk.Canvas(self.win, bg="#121212", highlightthickness=0, yscrollcommand=scrollbar.set)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+
+        self.canvas.bind("<Configure>", lambda e: self.layout())
+        self.canvas.bind("<MouseWheel>", lambda e: self.scroll("scroll", -1 if e.delta > 0 else 1, "units"))
+        self.canvas.bind("<Button-4>", lambda e: self.scroll("scroll", -1, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.scroll("scroll", 1, "units"))
+        self.canvas.bind("<Double-Button-1>", self.open_entry)
+        self.win.protocol("WM_DELETE_WINDOW", self.close)
+
+    def layout(self):
+        cols = max(1, self.canvas.winfo_width() // self.cell_w)
+        self.canvas.config(scrollregion=(0, 0, cols * self.cell_w, -(-self.total // cols) * self.cell_h),
+                           yscrollincrement=self.cell_h // 2)
+        if cols != self.cols:
+            self.cols = cols
+            self.canvas.delete("all")
+            self.cells.clear(); self.photos.clear()
+        self.refresh()
+
+    def scroll(self, *args):
+        self.canvas.yview(*args)
+        self.refresh()
+
+    def entry(self, i):
+        n = i // self.PAGE
+        if n not in self.pages:
+            self.pages[n] = self.fm.get_history(limit=self.PAGE, offset=n * self.PAGE, newest_first=True, type=self.KINDS)
+        page = self.pages[n]
+        return page[i % self.PAGE] if i % self.PAGE < len(page) else None
+
+    def refresh(self):
+        top = int(self.canvas.canvasy(0))
+        first = top // self.cell_h * self.cols
+        last = min(self.total, (top + self.canvas.winfo_height()) // self.cell_h * self.cols + self.cols)
+        for i in [i for i in self.cells if not first <= i < last]:
+            for item in self.cells.pop(i):
+                self.canvas.delete(item)
+            self.photos.pop(i, None)
+
+        visible = []
+        for i in range(first, last):
+            entry = self.entry(i)
+            if entry is None:
+                continue
+            visible.append(entry["path"])
+            if i in self.cells:
+                continue
+            x, y = (i % self.cols) * self.cell_w + self.cell_w // 2, (i // self.cols) * self.cell_h
+            self.cells[i] = (self.canvas.create_rectangle(x - self.thumb_w // 2, y + 8, x + self.thumb_w // 2, y + 8 + self.thumb_h, fill="#1e1e1e", outline=""),
+                             self.canvas.create_image(x, y + 8 + self.thumb_h // 2),
+                             self.canvas.create_text(x, y + self.cell_h - 10, text=entry["filename"], fill="#aaa", font=("Arial", 7)))
+            thumb = self.thumbs.get(entry["path"])
+            if thumb is not None:
+                self.show_thumb(i, thumb)
+            else:
+                self.thumbs.request(entry["path"]).add_done_callback(
+                    lambda f, i=i, path=entry["path"]: self.app.root.after(0, lambda: self.thumb_ready(i, path, f)))
+        self.thumbs.cancel(keep=visible) # Whatever scrolled away
+
+    def thumb_ready(self, i, path, future):
+        if self.closed or future.cancelled() or future.exception() or i not in self.cells:
+            return
+        entry = self.entry(i)
+        if entry and entry["path"] == path:
+            self.show_thumb(i, future.result())
+
+    def show_thumb(self, i, thumb):
+        self.photos[i] = ImageTk.PhotoImage(thumb)
+        self.canvas.itemconfig(self.cells[i][1], image=self.photos[i])
+
+    def open_entry(self, event):
+        col, row = int(self.canvas.canvasx(event.x)) // self.cell_w, int(self.canvas.canvasy(event.y)) // self.cell_h
+        entry = self.entry(row * self.cols + col) if col < self.cols and row * self.cols + col < self.total else None
+        if not entry:
+            return
+        if entry["type"] == "gif":
+            # Recordings aren't editable screenshots; hand them to the system viewer
+            try: os.startfile(entry["path"])
+            except: pass
+            return
+        # Edits overwrite the file only when it is already in the configured format
+        same_format = encoders.normalize(entry["type"])[0] == encoders.normalize(self.fm.config["format"])[0]
+        try:
+            with Image.open(entry["path"]) as img:
+                self.app.show_preview(img.convert("RGB"), entry["path"] if same_format else None)
+        except OSError as e:
+            messagebox.showerror("History", f"Can't open {entry['filename']}: {e}", parent=self.win)
+
+    def close(self):
+        self.closed = True
+        self.thumbs.cancel()
+        self.win.destroy()
+
 class SettingsWindow:
     def __init__(self, file_manager):
         self.fm = file_manager
         self.win = tk.Toplevel()
         self.win.title("Settings")
-        self.win.geometry("400x240")
+        self.win.geometry("400x420")
         self.win.attributes("-topmost", True)
         self.win.configure(bg="#1a1a1a")
         
@@ -338,8 +643,48 @@ class SettingsWindow:
         tk.Radiobutton(fmt_frame, text="GIF (Lightweight)", variable=self.fmt_var, value="gif", bg="#1a1a1a", fg="white", selectcolor="#333", activebackground="#1a1a1a").pack(side=tk.LEFT, padx=10)
         tk.Radiobutton(fmt_frame, text="MP4 (HQ - FFmpeg)", variable=self.fmt_var, value="mp4", bg="#1a1a1a", fg="white", selectcolor="#333", activebackground="#1a1a1a").pack(side=tk.LEFT, padx=10)
 
+        # Record FPS
+        tk.Label(self.win, text="Recording FPS:", fg="#888", bg="#1a1a1a", font=("Arial", 9)).pack(pady=(15, 5))
+        self.fps_var = tk.IntVar(value=self.fm.config.get("rec_fps", 10))
+        fps_frame = tk.Frame(self.win, bg="#1a1a1a")
+        fps_frame.pack()
+        for fps in FPS_CHOICES:
+            tk.Radiobutton(fps_frame, text=str(fps), variable=self.fps_var, value=fps, bg="#1a1a1a", fg="white", selectcolor="#333", activebackground="#1a1a1a").pack(side=tk.LEFT, padx=10)
+
+        # Image Format / Encoder Profile
+        tk.Label(self.win, text="Image Format & Encoder Profile:", fg="#888", bg="#1a1a1a", font=("Arial", 9)).pack(pady=(15, 5))
+        enc_frame = tk.Frame(self.win, bg="#1a1a1a")
+        enc_frame.pack()
+        self.img_fmt_var = tk.StringVar(value=self.fm.config.get("format", "png"))
+        self.profile_var = tk.StringVar(value=self.fm.config.get("profile", "balanced"))
+        self.formats = formats = [f for f in encoders.FORMATS if encoders.available(f)]
+        for var, values in ((self.img_fmt_var, formats), (self.profile_var, encoders.PROFILES)):
+            menu = tk.OptionMenu(enc_frame, var, *values)
+            menu.config(bg="#333", fg="white", relief="flat", highlightthickness=0, activebackground="#444")
+            menu.pack(side=tk.LEFT, padx=5)
+        self.btn_suggest = tk.Button(enc_frame, text="Suggest", command=self.suggest_profile, bg="#333", fg="white", relief="flat")
+        self.btn_suggest.pack(side=tk.LEFT, padx=5)
+
         tk.Button(self.win, text="Apply & Save Settings", bg="#0078d7", fg="white", relief="flat", pady=8, font=("Arial", 10, "bold"), command=self.save_cfg).pack(pady=20)
 
+    def suggest_profile(self):
+        # Encodes recent screenshots several times over, so keep it off the Tk thread
+        self.btn_suggest.config(text="...", state=tk.DISABLED)
+        def run():
+            report = encoders.benchmark(self.fm, formats=self.formats)
+            self.win.after(0, lambda: self.show_suggestion(report))
+        threading.Thread(target=run, daemon=True).start()
+
+    def show_suggestion(self, report):
+        self.btn_suggest.config(text="Suggest", state=tk.NORMAL)
+        if not report["suggestion"]:
+            messagebox.showinfo("Encoder Profile", "Take a few screenshots first.", parent=self.win)
+            return
+        fmt, profile = report["suggestion"]
+        self.img_fmt_var.set(fmt); self.profile_var.set(profile)
+        rows = "\n".join(f"{r['format']} {r['profile']}: {r['ms']:.0f} ms, {r['kb']:.0f} KB" for r in report["results"])
+        messagebox.showinfo("Encoder Profile", f"{rows}\n\nSuggested: {fmt} / {profile}", parent=self.win)
+
     def browse(self):
         d = filedialog.askdirectory()
         if d: self.ent.delete(0, tk.END); self.ent.insert(0, os.path.normpath(d))
@@ -352,10 +697,85 @@ class SettingsWindow:
         
         self.fm.save_config({
             "save_dir": new_dir,
-            "rec_format": self.fmt_var.get()
+            "rec_format": self.fmt_var.get(),
+            "rec_fps": self.fps_var.get(),
+            "format": self.img_fmt_var.get(),
+            "profile": self.profile_var.get()
         })
         messagebox.showinfo("Settings", "Settings saved successfully!")
         self.win.destroy()
 
+def run_timelapse(args):
+    """Headless timelapse: prints stats every few seconds and a JSON summary at the end."""
+    timelapse = Timelapse(FileManager(), args.timelapse, monitor_index=args.monitor, policy=args.policy,
+                          limit=args.count, duration=args.duration, encode_workers=args.workers)
+    print(f"Timelapse every {timelapse.interval}s into {timelapse.start()} (Ctrl+C to stop)")
+    try:
+        while timelapse.is_running:
+            timelapse.join(5)
+            stats, depth = timelapse.stats, timelapse.queue_depth
+            print(f"{stats.written} written, {stats.written / max(stats.elapsed, 1e-9):.2f}/s, "
+                  f"queues {depth['encode']}/{depth['write']}, dropped {stats.dropped}, coalesced {stats.coalesced}")
+    except KeyboardInterrupt:
+        timelapse.stop()
+        timelapse.join()
+    print(json.dumps(timelapse.stats.as_dict(timelapse.queue_depth), indent=4))
+
+def run_watch(args):
+    """Headless watch mode: saves the region whenever it changes, until Ctrl+C."""
+    x, y, w, h = (int(v) for v in args.watch.split(","))
+    watcher = RegionWatcher(FileManager(), (x, y, w, h))
+    watcher.start(on_save=lambda path, boxes: print(f"{path}: {len(boxes)} changed area(s)"))
+    print(f"Watching {w}x{h}+{x}+{y} (Ctrl+C to stop)")
+    try:
+        while watcher.is_running:
+            watcher.join(1)
+    except KeyboardInterrupt:
+        watcher.stop()
+        watcher.join()
+    print(f"{watcher.saved} saved in {watcher.polls} polls")
+
+def run_retention(args):
+    """One retention pass with the configured policy; prints what was reclaimed."""
+    daemon = RetentionDaemon(FileManager(), pause=0)
+    if not daemon.policy.enabled:
+        print("No retention rules configured (retention_* in config.json)")
+        return
+    print(json.dumps(daemon.run_once().as_dict(), indent=4))
+
+def run_dedupe(args):
+    """Finds near-duplicate images in a folder; links or deletes them with --dedupe-action."""
+    fm = FileManager()
+    result = dedupe_folder(fm, args.dedupe, int(fm.config.get("dedupe_distance", 4)), args.dedupe_action)
+    for dup, kept, distance in result["duplicates"]:
+        print(f"{distance:2d}  {dup}  ->  {kept}")
+    print(f"{len(result['duplicates'])} near-duplicates in {result['scanned']} images, "
+          f"{result['bytes'] / 2 ** 20:.1f} MB reclaimed")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="LightShot")
+    parser.add_argument("--timelapse", type=float, metavar="SECONDS", help="take a screenshot every SECONDS without the UI")
+    parser.add_argument("--duration", type=float, help="stop the timelapse after this many seconds")
+    parser.add_argument("--count", type=int, help="stop the timelapse after this many screenshots")
+    parser.add_argument("--monitor", type=int, default=1, help="monitor to capture (0 = all)")
+    parser.add_argument("--policy", choices=POLICIES, help="what to lose when the disk falls behind")
+    parser.add_argument("--workers", type=int, default=1, help="encoder threads")
+    parser.add_argument("--watch", metavar="X,Y,W,H", help="save the region whenever its contents change")
+    parser.add_argument("--retention", action="store_true", help="apply the retention rules once and report what was reclaimed")
+    parser.add_argument("--dedupe", metavar="FOLDER", help="find near-duplicate screenshots in FOLDER")
+    parser.add_argument("--dedupe-action", choices=("report", "link", "delete"), default="report",
+                        help="what to do with each duplicate (the oldest copy is kept)")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    ScreenshotApp().run()
+    args = parse_args()
+    if args.timelapse:
+        run_timelapse(args)
+    elif args.watch:
+        run_watch(args)
+    elif args.retention:
+        run_retention(args)
+    elif args.dedupe:
+        run_dedupe(args)
+    else:
+        ScreenshotApp().run()
@@ -1,10 +1,24 @@
 from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QComboBox, QCheckBox, QFileDialog
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from core import encoders
+
+class BenchmarkWorker(QThread):
+    """Runs encoders.benchmark off the GUI thread; report_ready carries its result."""
+    report_ready = pyqtSignal(dict)
+
+    def __init__(self, file_manager, formats):
+        super().__init__()
+        self.file_manager = file_manager
+        self.formats = formats
+
+    def run(self):
+        self.report_ready.emit(encoders.benchmark(self.file_manager, formats=self.formats))
 
 class SettingsDialog(QDialog):
     def __init__(self, file_manager):
         super().__init__()
         self.file_manager = file_manager
+        self.worker = None
         self.init_ui()
 
     def init_ui(self):
@@ -26,11 +40,22 @@ class SettingsDialog(QDialog):
         # Format
         fmt_layout = QHBoxLayout()
         self.combo_format = QComboBox()
-        self.combo_format.addItems(["png", "jpeg"])
+        self.combo_format.addItems([f for f in encoders.FORMATS if encoders.available(f)])
         self.combo_format.setCurrentText(self.file_manager.config["format"])
         fmt_layout.addWidget(QLabel("Image Format:"))
         fmt_layout.addWidget(self.combo_format)
         
+        # Encoder Profile
+        profile_layout = QHBoxLayout()
+        self.combo_profile = QComboBox()
+        self.combo_profile.addItems(encoders.PROFILES)
+        self.combo_profile.setCurrentText(self.file_manager.config.get("profile", "balanced"))
+        self.btn_suggest = QPushButton("Suggest")
+        self.btn_suggest.clicked.connect(self.suggest_profile)
+        profile_layout.addWidget(QLabel("Encoder Profile:"))
+        profile_layout.addWidget(self.combo_profile)
+        profile_layout.addWidget(self.btn_suggest)
+        
         # Watermark
         self.check_watermark = QCheckBox("Enable Watermark")
         self.check_watermark.setChecked(self.file_manager.config.get("enable_watermark", False))
@@ -42,6 +67,7 @@ class SettingsDialog(QDialog):
         
         layout.addLayout(dir_layout)
         layout.addLayout(fmt_layout)
+        layout.addLayout(profile_layout)
         layout.addWidget(self.check_watermark)
         layout.addStretch()
         layout.addWidget(btn_save)
@@ -53,10 +79,28 @@ class SettingsDialog(QDialog):
         if new_dir:
             self.edit_dir.setText(new_dir)
 
+    def suggest_profile(self):
+        # Encodes recent screenshots several times over, so keep it off the GUI thread
+        formats = [self.combo_format.itemText(i) for i in range(self.combo_format.count())]
+        self.btn_suggest.setEnabled(False)
+        self.btn_suggest.setText("...")
+        self.worker = BenchmarkWorker(self.file_manager, formats)
+        self.worker.report_ready.connect(self.show_suggestion)
+        self.worker.start()
+
+    def show_suggestion(self, report):
+        self.btn_suggest.setText("Suggest")
+        self.btn_suggest.setEnabled(True)
+        if report["suggestion"]:
+            fmt, profile = report["suggestion"]
+            self.combo_format.setCurrentText(fmt)
+            self.combo_profile.setCurrentText(profile)
+
     def save_settings(self):
         new_config = {
             "save_dir": self.edit_dir.text(),
             "format": self.combo_format.currentText(),
+            "profile": self.combo_profile.currentText(),
             "enable_watermark": self.check_watermark.isChecked()
         }
         self.file_manager.save_config(new_config)
@@ -0,0 +1,71 @@
+from PIL import Image
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+    HAS_NUMPY = False
+
+def bgra_view(raw, size):
+    """(h, w, 4) uint8 array over the grab buffer, without copying."""
+    w, h = size
+    return np.frombuffer(raw, dtype=np.uint8, count=w * h * 4).reshape(h, w, 4)
+
+def box_factor(width, max_width):
+    """Largest 2x/4x box factor that still leaves the frame at least max_width wide."""
+    for factor in (4, 2):
+        if width // factor >= max_width:
+            return factor
+    return 1
+
+def to_rgb_array(raw, size, crop=None, factor=1):
+    """
+    BGRA buffer -> contiguous (h, w, 3) RGB array. The crop and the channel
+    swap are views. An f x f box downscale accumulates strided views into
+    one uint16 buffer. The only full-size allocation is the final output.
+    crop: (left, top, right, bottom) in pixels of `size`. Edge pixels that
+    don't fill a whole box are dropped.
+    """
+    a = bgra_view(raw, size)
+    if crop:
+        l, t, r, b = crop
+        a = a[t:b, l:r]
+    if factor > 1:
+        h, w = a.shape[0] // factor, a.shape[1] // factor
+        acc = np.zeros((h, w, 3), dtype=np.uint16)
+        for dy in range(factor):
+            for dx in range(factor):
+                acc += a[dy:h * factor:factor, dx:w * factor:factor, 2::-1]
+        acc += factor * factor // 2
+        acc //= factor * factor
+        return acc.astype(np.uint8)
+    return np.ascontiguousarray(a[..., 2::-1])
+
+def _decode(raw, size, crop):
+    """Decodes (a crop of) the buffer with a row stride, without a full-frame intermediate."""
+    w, h = size
+    l, t, r, b = crop or (0, 0, w, h)
+    view = memoryview(raw)[(t * w + l) * 4:]
+    return Image.frombuffer("RGB", (r - l, b - t), view, "raw", "BGRX", w * 4, 1)
+
+def to_pil(raw, size, crop=None, factor=1, band=64):
+    """
+    BGRA buffer -> RGB PIL image with optional crop and 2x/4x box downscale.
+    Downscaling decodes `band` output rows at a time and reduces each band,
+    so the only full-size image ever allocated is the result. This beat
+    to_rgb_array on a 4K frame, so to_rgb_array is kept for callers that
+    want an array rather than a PIL image.
+    """
+    w, h = size
+    l, t, r, b = crop or (0, 0, w, h)
+    if factor == 1:
+        return _decode(raw, size, crop)
+    out_w, out_h = (r - l) // factor, (b - t) // factor
+    out = Image.new("RGB", (out_w, out_h))
+    step = band * factor
+    for y in range(0, out_h * factor, step):
+        rows = min(step, out_h * factor - y)
+        part = _decode(raw, size, (l, t + y, l + out_w * factor, t + y + rows))
+        out.paste(part.reduce(factor), (0, y // factor))
+    return out
@@ -1,5 +1,6 @@
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
+from PIL import Image, ImageDraw, ImageFont
 import os
+from utils.redaction import redact
 
 class ImageProcessor:
     @staticmethod
@@ -7,39 +8,55 @@ class ImageProcessor:
         """
         Applies blur to a specific region (box: (x1, y1, x2, y2)).
         """
-        region = image.crop(box)
-        blurred_region = region.filter(ImageFilter.GaussianBlur(radius=10))
-        image.paste(blurred_region, box)
-        return image
+        return redact(image, [box], "gaussian", radius=10)
 
     @staticmethod
-    def add_watermark(image, text, timestamp=True):
+    def redact(image, boxes, mode="gaussian", radius=10, block=12, color=(0, 0, 0)):
         """
-        Adds a watermark text and/or timestamp to the bottom right.
+        Redacts many regions at once: mode is gaussian, box, pixelate or
+        fill. Overlapping boxes are merged and each is processed once.
         """
-        draw = ImageDraw.Draw(image)
-        width, height = image.size
-        
-        from datetime import datetime
-        if timestamp:
-            text = f"{text} {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-        
-        # Try to load a font, fallback to default
+        return redact(image, boxes, mode, radius, block, color)
+
+    @staticmethod
+    def load_font(size):
         try:
-            font = ImageFont.truetype("arial.ttf", 20)
+            return ImageFont.truetype("arial.ttf", size)
         except IOError:
-            font = ImageFont.load_default()
-            
+            return ImageFont.load_default()
+
+    @staticmethod
+    def watermark_text(text, timestamp=True):
+        from datetime import datetime
+        return f"{text} {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}" if timestamp else text
+
+    @staticmethod
+    def _watermark_layout(size, text):
+        font = ImageProcessor.load_font(20)
         # Standard way to get text size in newer Pillow versions
-        bbox = draw.textbbox((0, 0), text, font=font)
+        bbox = ImageDraw.Draw(Image.new("L", (1, 1))).textbbox((0, 0), text, font=font)
         textwidth, textheight = bbox[2] - bbox[0], bbox[3] - bbox[1]
         
         margin = 10
-        x = width - textwidth - margin
-        y = height - textheight - margin
+        return font, size[0] - textwidth - margin, size[1] - textheight - margin
+
+    @staticmethod
+    def watermark_box(size, text):
+        """The area add_watermark(text, timestamp=False) draws over on an image of this size."""
+        _, x, y = ImageProcessor._watermark_layout(size, text)
+        return (x - 5, y - 5, size[0], size[1])
+
+    @staticmethod
+    def add_watermark(image, text, timestamp=True):
+        """
+        Adds a watermark text and/or timestamp to the bottom right.
+        """
+        text = ImageProcessor.watermark_text(text, timestamp)
+        font, x, y = ImageProcessor._watermark_layout(image.size, text)
+        draw = ImageDraw.Draw(image)
         
         # Draw background for readability
-        draw.rectangle([x-5, y-5, width, height], fill=(0, 0, 0, 128))
+        draw.rectangle([x-5, y-5, image.width, image.height], fill=(0, 0, 0, 128))
         draw.text((x, y), text, font=font, fill=(255, 255, 255, 255))
         return image
 
@@ -68,9 +85,5 @@ class ImageProcessor:
                   end_point[1] - arrow_len * math.sin(angle + math.pi/6))
             draw.polygon([end_point, p1, p2], fill=color)
         elif shape_type == "text" and text:
-            try:
-                font = ImageFont.truetype("arial.ttf", 24)
-            except IOError:
-                font = ImageFont.load_default()
-            draw.text(start_point, text, font=font, fill=color)
+            draw.text(start_point, text, font=ImageProcessor.load_font(24), fill=color)
         return image
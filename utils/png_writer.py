@@ -0,0 +1,145 @@
+import os
+import zlib
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+    HAS_NUMPY = False
+
+ADLER_BASE = 65521
+COLOR_TYPES = {"L": (0, 1), "RGB": (2, 3), "RGBA": (6, 4)} # mode -> (PNG colour type, bytes per pixel)
+
+def adler32_combine(adler1, adler2, len2):
+    """Adler-32 of A + B from adler32(A), adler32(B) and len(B), as in zlib's adler32_combine."""
+    rem = len2 % ADLER_BASE
+    sum1 = adler1 & 0xffff
+    sum2 = (rem * sum1) % ADLER_BASE
+    sum1 += (adler2 & 0xffff) + ADLER_BASE - 1
+    sum2 += (adler1 >> 16) + (adler2 >> 16) + ADLER_BASE - rem
+    if sum1 >= ADLER_BASE: sum1 -= ADLER_BASE
+    if sum1 >= ADLER_BASE: sum1 -= ADLER_BASE
+    if sum2 >= ADLER_BASE << 1: sum2 -= ADLER_BASE << 1
+    if sum2 >= ADLER_BASE: sum2 -= ADLER_BASE
+    return sum1 | (sum2 << 16)
+
+def _residuals(kind, a, up, bpp, out):
+    """Writes PNG filter `kind` of rows `a`, whose previous rows are `up`, into out (uint8 math wraps mod 256)."""
+    if kind == 0:
+        out[:] = a
+    elif kind == 2:
+        np.subtract(a, up, out=out)
+    elif kind == 1:
+        out[:, :bpp] = a[:, :bpp]
+        np.subtract(a[:, bpp:], a[:, :-bpp], out=out[:, bpp:])
+    elif kind == 3:
+        np.subtract(a[:, :bpp], up[:, :bpp] >> 1, out=out[:, :bpp])
+        np.subtract(a[:, bpp:], ((a[:, :-bpp].astype(np.uint16) + up[:, bpp:]) >> 1).astype(np.uint8), out=out[:, bpp:])
+    else:
+        np.subtract(a[:, :bpp], up[:, :bpp], out=out[:, :bpp]) # With no left neighbour Paeth predicts the byte above
+        left, above, corner = a[:, :-bpp].astype(np.int16), up[:, bpp:].astype(np.int16), up[:, :-bpp].astype(np.int16)
+        p = left + above - corner
+        pa, pb, pc = np.abs(p - left), np.abs(p - above), np.abs(p - corner)
+        np.subtract(a[:, bpp:], np.where((pa <= pb) & (pa <= pc), left, np.where(pb <= pc, above, corner)).astype(np.uint8), out=out[:, bpp:])
+
+# |signed byte| per residual value, for the filter choice heuristic
+_COST = np.minimum(np.arange(256), 256 - np.arange(256)).astype(np.uint8) if HAS_NUMPY else None
+
+def _filter_band(raw, stride, bpp, y0, y1, sample=7):
+    """
+    Filtered scanlines (filter byte + row) for rows y0..y1, as a flat
+    uint8 array, or bytes without NumPy. With NumPy each
+    row gets whichever of the five PNG filters has the smallest sum of
+    absolute signed residuals, the heuristic libpng uses. The sum is
+    estimated on every `sample`-th byte, so only the chosen filter runs
+    over the full row. Without NumPy rows are stored unfiltered.
+    """
+    if not HAS_NUMPY:
+        out = bytearray()
+        for y in range(y0, y1):
+            out += b"\x00"
+            out += raw[y * stride:(y + 1) * stride]
+        return bytes(out)
+
+    rows = np.frombuffer(raw, dtype=np.uint8, count=stride * y1).reshape(y1, stride)
+    a = rows[y0:y1]
+    up = rows[y0 - 1:y1 - 1] if y0 else np.vstack([np.zeros((1, stride), np.uint8), a[:-1]])
+
+    # Choose per row on sampled columns (each paired with its left neighbour)
+    sa, sl = a[:, bpp::sample], a[:, :stride - bpp:sample]
+    su, sc = up[:, bpp::sample], up[:, :stride - bpp:sample]
+    costs = []
+    for kind in range(5):
+        if kind == 0:
+            res = sa
+        elif kind == 1:
+            res = sa - sl
+        elif kind == 2:
+            res = sa - su
+        elif kind == 3:
+            res = sa - ((sl.astype(np.uint16) + su) >> 1).astype(np.uint8)
+        else:
+            l16, u16, c16 = sl.astype(np.int16), su.astype(np.int16), sc.astype(np.int16)
+            p = l16 + u16 - c16
+            pa, pb, pc = np.abs(p - l16), np.abs(p - u16), np.abs(p - c16)
+            res = sa - np.where((pa <= pb) & (pa <= pc), sl, np.where(pb <= pc, su, sc))
+        costs.append(_COST[res].sum(axis=1, dtype=np.uint32))
+    best = np.argmin(np.stack(costs), axis=0).astype(np.uint8)
+
+    # Filter runs of rows that chose the same filter as slices, without gathering rows
+    out = np.empty((len(a), stride + 1), dtype=np.uint8)
+    out[:, 0] = best
+    starts = [0] + list(np.flatnonzero(np.diff(best)) + 1) + [len(a)]
+    for s, e in zip(starts, starts[1:]):
+        _residuals(best[s], a[s:e], up[s:e], bpp, out[s:e, 1:])
+    return out.reshape(-1)
+
+def _deflate(data, level, zdict, last):
+    c = zlib.compressobj(level, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY, **({"zdict": zdict} if zdict is not None else {}))
+    return c.compress(data) + c.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH), zlib.adler32(data)
+
+def _chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+def encode_png(img, level=6, workers=None, band_rows=None):
+    """
+    Encodes a PIL image as one standard PNG, pigz-style: the image is cut
+    into horizontal bands, and each band is filtered and then deflated on
+    a thread pool. Both NumPy and zlib release the GIL for this work. Each
+    band's deflate is primed with the last 32 KiB of the band before it,
+    so the ratio stays close to a single stream. Band ends are sync-flushed
+    to byte boundaries, so the pieces concatenate into one zlib stream.
+    Returns bytes.
+    """
+    if img.mode not in COLOR_TYPES:
+        img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+    color_type, bpp = COLOR_TYPES[img.mode]
+    w, h = img.size
+    stride = w * bpp
+    raw = img.tobytes()
+    workers = workers or os.cpu_count() or 1
+    band_rows = band_rows or max(16, -(-h // (workers * 4)))
+    bands = [(y, min(h, y + band_rows)) for y in range(0, h, band_rows)]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        filtered = list(pool.map(lambda b: _filter_band(raw, stride, bpp, *b), bands))
+        jobs = [pool.submit(_deflate, data, level, filtered[i - 1][-32768:] if i else None, i == len(filtered) - 1)
+                for i, data in enumerate(filtered)]
+        parts = [j.result() for j in jobs]
+
+    adler = 1
+    for (_, band_adler), data in zip(parts, filtered):
+        adler = adler32_combine(adler, band_adler, len(data))
+    # zlib header: 32K window, FLEVEL from the level (-1 means 6), FCHECK so the pair is a multiple of 31
+    flg = 0x9C if level < 0 or level == 6 else 0x01 if level < 2 else 0x5E if level < 6 else 0xDA
+    idat = [d for d, _ in parts]
+    idat[0] = bytes((0x78, flg)) + idat[0]
+    idat[-1] += struct.pack(">I", adler)
+
+    out = [b"\x89PNG\r\n\x1a\n", _chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, color_type, 0, 0, 0))]
+    out += [_chunk(b"IDAT", piece) for piece in idat]
+    out.append(_chunk(b"IEND", b""))
+    return b"".join(out)